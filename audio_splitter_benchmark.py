@@ -0,0 +1,513 @@
+#!/usr/bin/env python3
+"""
+Split throughput benchmarks for the ZQ SFX Audio Splitter.
+
+Generates a reproducible corpus of synthetic BWF/RF64 files with bext and
+iXML chunks, times each split backend on it and saves the results as JSON,
+optionally comparing them against a stored baseline:
+
+    python audio_splitter_benchmark.py --suite quick -o results.json
+    python audio_splitter_benchmark.py --suite quick --baseline results.json
+"""
+import os
+import sys
+import json
+import time
+import struct
+import shutil
+import logging
+import argparse
+import platform
+import tempfile
+import subprocess
+from datetime import datetime
+import numpy as np
+from audio_splitter_engine import (
+    MAX_RIFF_SIZE,
+    WAVE_FORMAT_EXTENSIBLE,
+    WAVE_FORMAT_IEEE_FLOAT,
+    WAVE_FORMAT_PCM,
+    can_split_natively,
+    ffmpeg_path,
+    make_split_options,
+    read_wav_layout,
+    run_batch_tasks,
+    run_ffmpeg_multi_output,
+    run_ffmpeg_with_metadata,
+    split_wav_native,
+)
+
+logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+GB = 1024 * MB
+
+# (label, bits per sample, format tag) of every sample format in the corpus
+SAMPLE_FORMATS = [
+    ("pcm16", 16, WAVE_FORMAT_PCM),
+    ("pcm24", 24, WAVE_FORMAT_PCM),
+    ("pcm32", 32, WAVE_FORMAT_PCM),
+    ("float32", 32, WAVE_FORMAT_IEEE_FLOAT),
+]
+
+SUBFORMAT_GUID_TAIL = b'\x00\x00\x00\x00\x10\x00\x80\x00\x00\xaa\x00\x38\x9b\x71'
+
+def get_suite_cases(suite):
+    """
+    Return the corpus of a suite as a list of case dicts.
+    """
+    if suite == "quick":
+        cases = [
+            (channels, sample_format, 8 * MB, False)
+            for channels in (2, 8, 64)
+            for sample_format in SAMPLE_FORMATS
+        ]
+        cases.append((8, SAMPLE_FORMATS[1], 8 * MB, True))
+    elif suite == "full":
+        cases = [
+            (channels, sample_format, size, False)
+            for channels in (2, 8, 16, 32, 64)
+            for sample_format in SAMPLE_FORMATS
+            for size in (1 * MB, 256 * MB)
+        ]
+        cases.append((8, SAMPLE_FORMATS[1], 2 * GB, False))
+        cases.append((8, SAMPLE_FORMATS[1], 256 * MB, True))
+        cases.append((8, SAMPLE_FORMATS[1], 5 * GB, True))
+    else:
+        raise ValueError(f"Unknown benchmark suite: {suite}")
+
+    return [
+        {
+            "name": f"{channels}ch_{label}_{size // MB}MB{'_rf64' if rf64 else ''}",
+            "channels": channels,
+            "format": label,
+            "bits_per_sample": bits,
+            "format_tag": format_tag,
+            "size": size,
+            "rf64": rf64,
+            "sample_rate": 48000,
+        }
+        for channels, (label, bits, format_tag), size, rf64 in cases
+    ]
+
+def build_bext_chunk(description):
+    """
+    Build a version 2 bext chunk with fixed dates so the corpus is reproducible.
+    """
+    return b''.join([
+        description.encode('ascii')[:256].ljust(256, b'\x00'),
+        b'ZQ SFX Benchmark'.ljust(32, b'\x00'),
+        b'BENCH0001'.ljust(32, b'\x00'),
+        b'2024-01-01',
+        b'12:00:00',
+        struct.pack('<II', 0, 0),
+        struct.pack('<H', 2),
+        bytes(64),
+        struct.pack('<hhhhh', 0, 0, 0, 0, 0),
+        bytes(180),
+        b'A=PCM,F=48000,W=24,M=multi,T=synthetic\r\n',
+    ])
+
+def build_ixml_chunk(channels):
+    tracks = ''.join(
+        f"<TRACK><CHANNEL_INDEX>{idx}</CHANNEL_INDEX>"
+        f"<INTERLEAVE_INDEX>{idx}</INTERLEAVE_INDEX>"
+        f"<NAME>Track {idx}</NAME></TRACK>"
+        for idx in range(1, channels + 1)
+    )
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<BWFXML><IXML_VERSION>1.61</IXML_VERSION><PROJECT>benchmark</PROJECT>'
+        f'<TRACK_LIST><TRACK_COUNT>{channels}</TRACK_COUNT>{tracks}</TRACK_LIST>'
+        '</BWFXML>'
+    ).encode('utf-8')
+
+def build_fmt_chunk(case):
+    channels = case["channels"]
+    bits = case["bits_per_sample"]
+    block_align = channels * bits // 8
+    fmt_data = struct.pack(
+        '<HHIIHH',
+        WAVE_FORMAT_EXTENSIBLE,
+        channels,
+        case["sample_rate"],
+        case["sample_rate"] * block_align,
+        block_align,
+        bits,
+    )
+    channel_mask = (1 << channels) - 1 if channels <= 18 else 0
+    return fmt_data + struct.pack('<HHI', 22, bits, channel_mask) + (
+        struct.pack('<H', case["format_tag"]) + SUBFORMAT_GUID_TAIL
+    )
+
+def make_noise_block(case, frames):
+    """
+    Seeded noise at about -12 dBFS in the sample format of the case.
+    """
+    rng = np.random.default_rng(case["channels"] * 1000 + case["bits_per_sample"])
+    noise = rng.uniform(-0.25, 0.25, size=(frames, case["channels"]))
+    if case["format_tag"] == WAVE_FORMAT_IEEE_FLOAT:
+        return noise.astype('<f4').tobytes()
+    bits = case["bits_per_sample"]
+    values = (noise * (2 ** (bits - 1) - 1)).astype('<i4')
+    if bits == 16:
+        return values.astype('<i2').tobytes()
+    if bits == 24:
+        return values.view(np.uint8).reshape(-1, 4)[:, :3].tobytes()
+    return values.tobytes()
+
+def get_case_data_size(case):
+    block_align = case["channels"] * case["bits_per_sample"] // 8
+    return max(case["size"] // block_align, 1) * block_align
+
+def write_synthetic_wav(path, case, block_size=4 * MB):
+    """
+    Write a synthetic multichannel BWF (or RF64 when the case asks for it or
+    the data outgrows RIFF) of about case["size"] bytes.
+    """
+    block_align = case["channels"] * case["bits_per_sample"] // 8
+    data_size = get_case_data_size(case)
+    frames = data_size // block_align
+    chunks = [
+        (b'bext', build_bext_chunk(case["name"])),
+        (b'fmt ', build_fmt_chunk(case)),
+        (b'iXML', build_ixml_chunk(case["channels"])),
+    ]
+    header_size = 4 + 36 + sum(8 + len(data) + (len(data) & 1) for _, data in chunks) + 8
+    riff_size = header_size + data_size + (data_size & 1)
+    rf64 = case["rf64"] or riff_size > MAX_RIFF_SIZE
+
+    with open(path, 'wb') as f:
+        if rf64:
+            f.write(b'RF64' + struct.pack('<I', MAX_RIFF_SIZE) + b'WAVE')
+            f.write(b'ds64' + struct.pack('<IQQQI', 28, riff_size, data_size, frames, 0))
+        else:
+            f.write(b'RIFF' + struct.pack('<I', riff_size) + b'WAVE')
+            f.write(b'JUNK' + struct.pack('<I', 28) + bytes(28))
+        for chunk_id, chunk_data in chunks:
+            f.write(chunk_id + struct.pack('<I', len(chunk_data)) + chunk_data)
+            if len(chunk_data) & 1:
+                f.write(b'\x00')
+        f.write(b'data' + struct.pack('<I', MAX_RIFF_SIZE if rf64 else data_size))
+
+        block_frames = max(block_size // block_align, 1)
+        block = make_noise_block(case, block_frames)
+        remaining = data_size
+        while remaining > 0:
+            f.write(block[:remaining])
+            remaining -= min(len(block), remaining)
+        if data_size & 1:
+            f.write(b'\x00')
+
+def ensure_corpus(corpus_dir, cases):
+    """
+    Generate any corpus file that is missing or whose channels, sample
+    format, data size or RF64 header do not match its case.
+    """
+    os.makedirs(corpus_dir, exist_ok=True)
+    for case in cases:
+        path = os.path.join(corpus_dir, f"{case['name']}.wav")
+        case["path"] = path
+        layout = read_wav_layout(path) if os.path.exists(path) else None
+        if (
+            not layout
+            or layout.get("channels") != case["channels"]
+            or layout.get("format_tag") != case["format_tag"]
+            or layout.get("bits_per_sample") != case["bits_per_sample"]
+            or layout.get("data_size") != get_case_data_size(case)
+            # Large cases are RF64 even when they do not ask for it
+            or (case["rf64"] and not layout.get("rf64"))
+        ):
+            logger.info(f"Generating {path}")
+            write_synthetic_wav(path, case)
+            layout = read_wav_layout(path)
+        case["data_size"] = layout["data_size"]
+        case["duration"] = layout["data_size"] / layout["block_align"] / layout["sample_rate"]
+        case["layout"] = layout
+
+# File that every process of a timed run logs its spawns to, one line each
+SPAWN_LOG_ENV = "ZQ_BENCHMARK_SPAWN_LOG"
+
+def log_spawns(log_path):
+    """
+    Log every subprocess this process starts to log_path and return the
+    original Popen.__init__.
+    """
+    original_init = subprocess.Popen.__init__
+
+    def logging_init(popen, *args, **kwargs):
+        with open(log_path, "a") as f:
+            f.write("popen\n")
+        return original_init(popen, *args, **kwargs)
+
+    subprocess.Popen.__init__ = logging_init
+    return original_init
+
+class SpawnCounter:
+    """
+    Count the processes started while the block runs: subprocesses of this
+    process, batch pool workers and the FFmpeg processes those workers
+    start. Spawned pool workers import this script as their main module,
+    find SPAWN_LOG_ENV and log themselves and their own subprocesses.
+    """
+    def __enter__(self):
+        fd, self.log_path = tempfile.mkstemp(prefix="zq_spawns_", suffix=".log")
+        os.close(fd)
+        os.environ[SPAWN_LOG_ENV] = self.log_path
+        self.original_init = log_spawns(self.log_path)
+        self.count = 0
+        return self
+
+    def __exit__(self, *exc_info):
+        subprocess.Popen.__init__ = self.original_init
+        del os.environ[SPAWN_LOG_ENV]
+        with open(self.log_path, "r") as f:
+            self.count = sum(1 for _ in f)
+        os.remove(self.log_path)
+        return False
+
+if __name__ == "__mp_main__" and os.environ.get(SPAWN_LOG_ENV):
+    # A batch pool worker spawned during a timed run
+    with open(os.environ[SPAWN_LOG_ENV], "a") as f:
+        f.write("worker\n")
+    log_spawns(os.environ[SPAWN_LOG_ENV])
+
+def read_io_counters():
+    """
+    Bytes read by this process and its reaped children, from /proc/self/io:
+    rchar counts every read() including pipes, read_bytes only what was
+    fetched from storage. None where the kernel does not report them.
+    """
+    try:
+        with open("/proc/self/io", "r") as f:
+            counters = dict(line.split(": ") for line in f.read().splitlines() if line)
+        return {"rchar": int(counters["rchar"]), "read_bytes": int(counters["read_bytes"])}
+    except (OSError, KeyError, ValueError):
+        return None
+
+def get_channel_outputs(case, output_dir):
+    return [
+        (channel_idx, os.path.join(output_dir, f"{case['name']}_Ch{channel_idx + 1}.wav"))
+        for channel_idx in range(case["channels"])
+    ]
+
+def run_native(case, output_dir, workers):
+    if not can_split_natively(case["layout"]):
+        return None
+    return split_wav_native(case["path"], get_channel_outputs(case, output_dir), None, case["layout"])
+
+def run_ffmpeg_single_pass(case, output_dir, workers):
+    if not ffmpeg_path:
+        return None
+    return run_ffmpeg_multi_output(case["path"], get_channel_outputs(case, output_dir))
+
+def run_ffmpeg_per_channel(case, output_dir, workers):
+    if not ffmpeg_path:
+        return None
+    return all(
+        run_ffmpeg_with_metadata(case["path"], channel_idx, output_file)
+        for channel_idx, output_file in get_channel_outputs(case, output_dir)
+    )
+
+# Backends timed per corpus file; each returns True/False, or None when it cannot run here
+BACKENDS = {
+    "native": run_native,
+    "ffmpeg_single_pass": run_ffmpeg_single_pass,
+    "ffmpeg_per_channel": run_ffmpeg_per_channel,
+}
+
+def get_dir_size(path):
+    total = 0
+    for dir_path, _, file_names in os.walk(path):
+        for file_name in file_names:
+            total += os.path.getsize(os.path.join(dir_path, file_name))
+    return total
+
+def measure(name, backend, run, output_dir, source_bytes, duration):
+    """
+    Time one run into a fresh output directory and return its result dict.
+    bytes_read is everything read by the run and the processes it started,
+    FFmpeg pipes and pool worker start-up included; storage_bytes_read is
+    the part that missed the page cache. Both are None off Linux.
+    """
+    shutil.rmtree(output_dir, ignore_errors=True)
+    os.makedirs(output_dir)
+    with SpawnCounter() as spawns:
+        io_before = read_io_counters()
+        start = time.perf_counter()
+        success = run()
+        wall_time = time.perf_counter() - start
+        io_after = read_io_counters()
+    if success is None:
+        return None
+    bytes_read = storage_bytes_read = None
+    if io_before and io_after:
+        bytes_read = io_after["rchar"] - io_before["rchar"]
+        storage_bytes_read = io_after["read_bytes"] - io_before["read_bytes"]
+    bytes_written = get_dir_size(output_dir)
+    shutil.rmtree(output_dir, ignore_errors=True)
+    return {
+        "case": name,
+        "backend": backend,
+        "success": bool(success),
+        "wall_time": wall_time,
+        "mb_per_s": source_bytes / MB / wall_time if wall_time else 0.0,
+        "realtime_factor": duration / wall_time if wall_time else 0.0,
+        "process_spawns": spawns.count,
+        "bytes_read": bytes_read,
+        "storage_bytes_read": storage_bytes_read,
+        "bytes_written": bytes_written,
+    }
+
+def best_of(repeat, measure_once):
+    """
+    Run a measurement repeat times and keep the fastest run.
+    """
+    results = [measure_once() for _ in range(repeat)]
+    results = [result for result in results if result is not None]
+    return min(results, key=lambda result: result["wall_time"]) if results else None
+
+def run_benchmarks(cases, backends, output_dir, workers, repeat):
+    results = []
+    for case in cases:
+        for backend in backends:
+            run = BACKENDS[backend]
+            result = best_of(repeat, lambda: measure(
+                case["name"],
+                backend,
+                lambda: run(case, output_dir, workers),
+                output_dir,
+                case["data_size"],
+                case["duration"],
+            ))
+            if result is None:
+                logger.info(f"Skipping {backend} for {case['name']}: not available here")
+                continue
+            result.update(
+                channels=case["channels"],
+                format=case["format"],
+                rf64=case["layout"]["rf64"],
+                duration=case["duration"],
+            )
+            results.append(result)
+            print_result(result)
+
+    # The whole corpus through the batch path the GUI and command line use
+    options = make_split_options()
+    task_args = [(case["path"], output_dir, options) for case in cases]
+    result = best_of(repeat, lambda: measure(
+        "corpus",
+        f"batch_{workers}_workers",
+        lambda: all(result["success"] for result in run_batch_tasks(task_args, workers, lambda idx, result: None)),
+        output_dir,
+        sum(case["data_size"] for case in cases),
+        sum(case["duration"] for case in cases),
+    ))
+    if result is not None:
+        results.append(result)
+        print_result(result)
+    return results
+
+def print_result(result):
+    print(
+        f"{result['case']:<28} {result['backend']:<22} "
+        f"{result['wall_time']:9.3f}s {result['mb_per_s']:9.1f} MB/s "
+        f"{result['realtime_factor']:9.1f}x realtime  spawns={result['process_spawns']}"
+        f"{'' if result['success'] else '  FAILED'}"
+    )
+
+def get_ffmpeg_version():
+    if not ffmpeg_path:
+        return None
+    try:
+        return subprocess.check_output([ffmpeg_path, "-version"]).decode().splitlines()[0]
+    except Exception:
+        return None
+
+def compare_with_baseline(results, baseline_path, tolerance):
+    """
+    Print throughput changes against a saved run and return the regressions.
+    """
+    with open(baseline_path, "r") as f:
+        baseline = {
+            (result["case"], result["backend"]): result for result in json.load(f)["results"]
+        }
+    regressions = []
+    print(f"\nCompared with {baseline_path}:")
+    for result in results:
+        previous = baseline.get((result["case"], result["backend"]))
+        if not previous or not previous["mb_per_s"]:
+            continue
+        change = result["mb_per_s"] / previous["mb_per_s"] - 1
+        flag = ""
+        if change < -tolerance:
+            flag = "  REGRESSION"
+            regressions.append(result)
+        print(f"{result['case']:<28} {result['backend']:<22} {change * 100:+7.1f}%{flag}")
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark split throughput on a synthetic corpus.")
+    parser.add_argument("--suite", choices=("quick", "full"), default="quick")
+    parser.add_argument(
+        "--corpus-dir",
+        default="benchmark_corpus",
+        help="Where the synthetic files are generated and reused between runs",
+    )
+    parser.add_argument("-o", "--output", default="benchmark_results.json", help="JSON results file")
+    parser.add_argument("--baseline", help="Earlier JSON results to compare against")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.10,
+        help="Slowdown against the baseline reported as a regression (default: 0.10)",
+    )
+    parser.add_argument(
+        "--backends",
+        default=",".join(BACKENDS),
+        help=f"Comma-separated backends to time (default: {','.join(BACKENDS)})",
+    )
+    parser.add_argument("-j", "--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--repeat", type=int, default=1, help="Keep the fastest of this many runs")
+    parser.add_argument("-v", "--verbose", action="store_true")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.INFO if args.verbose else logging.WARNING,
+        format="%(asctime)s - %(levelname)s - %(message)s",
+        handlers=[logging.StreamHandler(sys.stderr)],
+    )
+
+    backends = [backend.strip() for backend in args.backends.split(",") if backend.strip()]
+    unknown = set(backends) - set(BACKENDS)
+    if unknown:
+        parser.error(f"Unknown backends: {', '.join(sorted(unknown))}")
+
+    cases = get_suite_cases(args.suite)
+    ensure_corpus(args.corpus_dir, cases)
+    output_dir = os.path.join(args.corpus_dir, "output")
+    results = run_benchmarks(cases, backends, output_dir, args.workers, args.repeat)
+
+    report = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "suite": args.suite,
+        "workers": args.workers,
+        "repeat": args.repeat,
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "cpu_count": os.cpu_count(),
+        "ffmpeg": get_ffmpeg_version(),
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    if args.baseline:
+        if compare_with_baseline(results, args.baseline, args.tolerance):
+            return 1
+    return 0 if all(result["success"] for result in results) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
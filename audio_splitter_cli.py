@@ -0,0 +1,449 @@
+#!/usr/bin/env python3
+"""
+Command line entry point for the ZQ SFX Audio Splitter.
+
+Runs the same split engine as the GUI without loading tkinter, so batches
+can be scripted or run on headless machines:
+
+    python audio_splitter_cli.py INPUT [INPUT ...] -o OUTPUT_DIR [options]
+    python audio_splitter_cli.py INPUT_DIR -o OUTPUT_DIR --watch --preset PRESET
+"""
+import os
+import sys
+import argparse
+import logging
+import signal
+import time
+import threading
+import multiprocessing
+from audio_splitter_engine import (
+    ANALYSIS_FORMATS,
+    DEFAULT_STREAM_BLOCK_SIZE,
+    DUPLICATE_ACTIONS,
+    PCM_BIT_DEPTHS,
+    RESAMPLERS,
+    VERIFICATION_POLICIES,
+    append_analysis_rows,
+    build_timing_report,
+    CancelToken,
+    format_timing_report,
+    ffmpeg_path,
+    get_analysis_path,
+    get_journal_path,
+    get_mirrored_output_dir,
+    get_progress_totals,
+    get_timings_path,
+    iter_watch_tasks,
+    iter_wav_files,
+    load_split_preset,
+    make_split_options,
+    parse_channel_groups,
+    run_batch_tasks,
+    save_split_preset,
+    ThroughputMeter,
+    write_analysis_sidecar,
+    write_timing_spans,
+)
+
+logger = logging.getLogger(__name__)
+
+def parse_channel_list(value):
+    """
+    Parse a 1-based channel list such as "1,3,5-8" into sorted 0-based indexes.
+    """
+    channels = set()
+    for part in value.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        try:
+            if "-" in part:
+                start, end = (int(bound) for bound in part.split("-", 1))
+            else:
+                start = end = int(part)
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"Invalid channel list: '{value}'")
+        if start < 1 or end < start:
+            raise argparse.ArgumentTypeError(f"Invalid channel range: '{part}'")
+        channels.update(range(start - 1, end))
+    if not channels:
+        raise argparse.ArgumentTypeError("No channels selected")
+    return sorted(channels)
+
+def parse_group_map(value):
+    try:
+        return parse_channel_groups(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="Split multichannel WAV files into one mono file per channel."
+    )
+    parser.add_argument(
+        "inputs", nargs="+", help="WAV files or directories of WAV files to split"
+    )
+    parser.add_argument(
+        "-o", "--output-dir", required=True, help="Directory to write the split files to"
+    )
+    parser.add_argument(
+        "-c",
+        "--channels",
+        type=parse_channel_list,
+        help="1-based channels to export, e.g. '1,2' or '3-8' (default: all)",
+    )
+    parser.add_argument(
+        "-g",
+        "--groups",
+        type=parse_group_map,
+        help="Write channel groups as interleaved files instead of mono channels, "
+        "e.g. '1-2:stereo,3-7:5.0,8:mono' (layout optional, '1+3' for non-adjacent channels)",
+    )
+    parser.add_argument(
+        "--names",
+        help="Comma-separated custom channel names, used instead of _chanN suffixes",
+    )
+    parser.add_argument(
+        "--bit-depth", type=int, choices=PCM_BIT_DEPTHS, help="Write integer PCM of this bit depth (default: match the source format)"
+    )
+    parser.add_argument("--sample-rate", type=int, help="Override the output sample rate")
+    parser.add_argument(
+        "--resampler",
+        choices=RESAMPLERS,
+        help="FFmpeg resampler used with --sample-rate; soxr is slower but higher quality (default: swr)",
+    )
+    parser.add_argument(
+        "-j",
+        "--workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Number of files to split in parallel (default: CPU count)",
+    )
+    parser.add_argument(
+        "--block-size",
+        type=int,
+        help=f"Bytes of audio read per streaming block (default: {DEFAULT_STREAM_BLOCK_SIZE})",
+    )
+    parser.add_argument(
+        "--verify",
+        choices=VERIFICATION_POLICIES,
+        help="Re-read output metadata after writing (default: off)",
+    )
+    parser.add_argument(
+        "--debug-dumps",
+        action="store_true",
+        help="Keep debug_metadata dumps next to the outputs when verifying",
+    )
+    parser.add_argument(
+        "--no-resume",
+        action="store_true",
+        help="Split every file again, even outputs the journal shows are up to date",
+    )
+    parser.add_argument(
+        "--silence-threshold",
+        type=float,
+        metavar="DBFS",
+        help="Skip outputs whose peak stays below this level, e.g. -60 (default: keep all)",
+    )
+    parser.add_argument(
+        "--quarantine-silent",
+        action="store_true",
+        help="Move silent outputs into a 'silent' folder instead of removing them",
+    )
+    parser.add_argument(
+        "--duplicates",
+        choices=DUPLICATE_ACTIONS,
+        help="Keep one file for bit-identical channels and hard link the others, "
+        "or list them in a _duplicates.json manifest (default: write every channel)",
+    )
+    parser.add_argument(
+        "--analysis",
+        choices=ANALYSIS_FORMATS,
+        help="Write peak, true peak, RMS, DC offset and loudness of every output "
+        "to channel_analysis.jsonl or .csv in OUTPUT_DIR",
+    )
+    parser.add_argument(
+        "--bext-loudness",
+        action="store_true",
+        help="Fill the loudness fields of the bext chunk in outputs that have one",
+    )
+    parser.add_argument(
+        "--peak-files",
+        action="store_true",
+        help="Write a min/max waveform overview next to every output as <output>.peaks",
+    )
+    parser.add_argument(
+        "--preset",
+        help="JSON file of split settings; options given on the command line win",
+    )
+    parser.add_argument(
+        "--save-preset",
+        help="Write the resulting split settings to this JSON file",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Keep running and split recordings as they are copied into INPUT",
+    )
+    parser.add_argument(
+        "--debounce",
+        type=float,
+        default=10.0,
+        help="Seconds a file's size must stay unchanged before it is split (default: 10)",
+    )
+    parser.add_argument(
+        "--poll-interval",
+        type=float,
+        default=2.0,
+        help="Seconds between checks of the watched folder (default: 2)",
+    )
+    parser.add_argument(
+        "--timings",
+        help="JSON lines file for per-stage timings (default: .zq_split_timings.jsonl in OUTPUT_DIR)",
+    )
+    parser.add_argument(
+        "-v", "--verbose", action="store_true", help="Log progress details to stderr"
+    )
+    parser.add_argument(
+        "-q", "--quiet", action="store_true", help="Only print errors"
+    )
+    return parser
+
+def iter_input_files(inputs, output_dir):
+    """
+    Yield (input_file, output_dir) for every WAV file named by the inputs.
+    Folders are walked recursively and mirrored under the output directory.
+    """
+    for path in inputs:
+        if os.path.isdir(path):
+            for input_file in iter_wav_files(path, exclude_dirs=[output_dir]):
+                yield input_file, get_mirrored_output_dir(input_file, path, output_dir)
+        elif os.path.isfile(path):
+            yield path, output_dir
+        else:
+            logger.error(f"Input '{path}' does not exist.")
+
+class ConsoleProgress:
+    """
+    Prints a status line with percentage, MB/s, speed against realtime and
+    ETA to stderr as bytes of source audio are processed.
+    """
+    # Seconds between redraws while the percentage stands still
+    STATUS_INTERVAL = 0.5
+
+    def __init__(self, enabled=True):
+        self.meter = ThroughputMeter()
+        self.last_percent = -1
+        self.last_draw = 0.0
+        self.line_width = 0
+        self.enabled = enabled
+        self.lock = threading.Lock()
+
+    def add_total(self, num_bytes, seconds=0.0):
+        with self.lock:
+            self.meter.add_total(num_bytes, seconds)
+
+    def __call__(self, num_bytes):
+        with self.lock:
+            self.meter.add(num_bytes)
+            percent = self.meter.get_percent()
+            now = time.monotonic()
+            if not self.enabled:
+                return
+            if percent != self.last_percent or now - self.last_draw >= self.STATUS_INTERVAL:
+                self.last_percent = percent
+                self.last_draw = now
+                status = f"Progress: {self.meter.format_status()}"
+                sys.stderr.write("\r" + status.ljust(self.line_width))
+                sys.stderr.flush()
+                self.line_width = len(status)
+
+    def finish(self):
+        with self.lock:
+            if self.enabled and self.last_percent >= 0:
+                sys.stderr.write("\n")
+                sys.stderr.flush()
+                self.last_percent = -1
+
+def install_cancel_handler(cancel_token):
+    """
+    Make the first Ctrl+C cancel the batch cleanly; a second one aborts at once.
+    """
+    def on_interrupt(signum, frame):
+        if cancel_token.is_cancelled():
+            raise KeyboardInterrupt
+        logger.warning("Cancelling, press Ctrl+C again to abort immediately.")
+        cancel_token.cancel()
+
+    return signal.signal(signal.SIGINT, on_interrupt)
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.watch and (len(args.inputs) != 1 or not os.path.isdir(args.inputs[0])):
+        parser.error("--watch needs exactly one input directory")
+
+    if args.verbose:
+        level = logging.DEBUG
+    elif args.quiet:
+        level = logging.ERROR
+    else:
+        level = logging.WARNING
+    logging.basicConfig(
+        level=level,
+        format="%(asctime)s - %(levelname)s - %(message)s",
+        handlers=[logging.StreamHandler(sys.stderr)],
+    )
+
+    if not ffmpeg_path:
+        logger.warning(
+            "FFmpeg not found. Only PCM WAV files without sample rate overrides can be split."
+        )
+
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    preset = {}
+    if args.preset:
+        try:
+            preset = load_split_preset(args.preset)
+        except Exception as e:
+            logger.error(f"Could not load preset '{args.preset}': {e}")
+            return 1
+
+    # Only the options given on the command line override the preset
+    cli_options = {
+        "override_bit_depth": args.bit_depth,
+        "override_sample_rate": args.sample_rate,
+        "resampler": args.resampler,
+        "selected_channels": args.channels,
+        "channel_groups": args.groups,
+        "block_size": args.block_size,
+        "verification": args.verify,
+        "debug_dumps": args.debug_dumps or None,
+        "resume": False if args.no_resume else None,
+        "silence_threshold_db": args.silence_threshold,
+        "silent_action": "quarantine" if args.quarantine_silent else None,
+        "duplicate_action": args.duplicates,
+        "analysis": args.analysis,
+        "bext_loudness": args.bext_loudness or None,
+        "peak_files": args.peak_files or None,
+    }
+    if args.names:
+        cli_options["naming_scheme"] = "custom"
+        cli_options["custom_names"] = [name.strip() for name in args.names.split(",")]
+    options = make_split_options(
+        **{
+            **preset,
+            **{key: value for key, value in cli_options.items() if value is not None},
+            "journal_path": get_journal_path(args.output_dir),
+        }
+    )
+    if args.save_preset:
+        save_split_preset(args.save_preset, options)
+
+    progress = ConsoleProgress(
+        enabled=not args.quiet and not args.watch and sys.stderr.isatty()
+    )
+
+    def discover_tasks():
+        # Workers start on the first files while folders are still being walked
+        for input_file, output_dir in iter_input_files(args.inputs, args.output_dir):
+            try:
+                progress.add_total(*get_progress_totals(input_file))
+            except Exception:
+                progress.add_total(os.path.getsize(input_file))
+            yield input_file, output_dir, options
+
+    timings_path = args.timings or get_timings_path(args.output_dir)
+    analysis_path = None
+    if options["analysis"]:
+        analysis_path = get_analysis_path(args.output_dir, options["analysis"])
+
+    def on_result(idx, result):
+        write_timing_spans(timings_path, result)
+        if analysis_path and args.watch:
+            # A watch never ends, so each file's rows are appended as it finishes
+            append_analysis_rows(analysis_path, result["analysis"], options["analysis"])
+        if result["cancelled"]:
+            logger.info(result["error"])
+        elif not result["success"]:
+            logger.error(result["error"])
+        elif not args.quiet:
+            progress.finish()
+            duplicates = {duplicate["output"] for duplicate in result["duplicates"]}
+            for output_file in result["outputs"]:
+                if output_file not in duplicates:
+                    print(output_file)
+            for output_file in result["skipped"]:
+                print(f"{output_file} (up to date)")
+            for silent in result["silent"]:
+                if silent["moved_to"]:
+                    print(f"{silent['moved_to']} (silent, quarantined)")
+                else:
+                    print(f"{silent['output']} (silent, skipped)")
+            for duplicate in result["duplicates"]:
+                state = "linked" if duplicate["linked"] else "in manifest"
+                print(f"{duplicate['output']} (duplicate of {duplicate['original']}, {state})")
+
+    cancel_token = CancelToken()
+    previous_handler = install_cancel_handler(cancel_token)
+    try:
+        if args.watch:
+            logger.info("Watch mode started, press Ctrl+C to stop.")
+            tasks = iter_watch_tasks(
+                args.inputs[0],
+                args.output_dir,
+                options,
+                debounce=args.debounce,
+                poll_interval=args.poll_interval,
+            )
+            try:
+                run_batch_tasks(
+                    tasks, args.workers, on_result, cancel_token=cancel_token, keep_results=False
+                )
+            except KeyboardInterrupt:
+                pass
+            finally:
+                # Stops the watchdog observer now rather than whenever the generator is collected
+                tasks.close()
+            logger.info("Watch mode stopped.")
+            return 0
+
+        results = run_batch_tasks(
+            discover_tasks(), args.workers, on_result, progress, cancel_token
+        )
+    finally:
+        signal.signal(signal.SIGINT, previous_handler)
+    progress.finish()
+    if analysis_path:
+        write_analysis_sidecar(analysis_path, results, options["analysis"])
+
+    if cancel_token.is_cancelled():
+        finished = sum(1 for result in results if result["success"])
+        logger.error(f"Cancelled after splitting {finished} file(s).")
+        return 130
+    if not results:
+        logger.error("No .wav files to split.")
+        return 1
+    if not args.quiet:
+        sys.stderr.write(format_timing_report(build_timing_report(results)) + "\n")
+        silent_count = sum(len(result["silent"]) for result in results)
+        if silent_count:
+            sys.stderr.write(f"{silent_count} silent output(s) set aside.\n")
+        duplicates = [duplicate for result in results for duplicate in result["duplicates"]]
+        if duplicates:
+            linked_count = sum(1 for duplicate in duplicates if duplicate["linked"])
+            sys.stderr.write(
+                f"{len(duplicates)} duplicate output(s): {linked_count} linked, "
+                f"{len(duplicates) - linked_count} listed in a manifest.\n"
+            )
+
+    failed = [result for result in results if not result["success"]]
+    if failed:
+        logger.error(f"{len(failed)} of {len(results)} files failed to split.")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
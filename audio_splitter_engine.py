@@ -0,0 +1,2991 @@
+#!/usr/bin/env python3
+"""
+Split engine shared by the ZQ SFX Audio Splitter GUI and command line.
+Nothing in this module imports tkinter, so it can run on headless machines.
+"""
+import os
+import sys
+import io
+import struct
+import json
+import csv
+import sqlite3
+import zlib
+import hashlib
+import shutil
+import logging
+import traceback
+import threading
+import queue
+import time
+import math
+import signal
+import subprocess
+import concurrent.futures
+import multiprocessing
+import xml.etree.ElementTree as ET
+from contextlib import contextmanager
+import numpy as np
+
+try:
+    # Optional: lets watch mode wake on inotify/FSEvents instead of only polling
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+except ImportError:
+    Observer = None
+    FileSystemEventHandler = object
+
+logger = logging.getLogger(__name__)
+
+def get_application_root():
+    if getattr(sys, "frozen", False):
+        app_root = sys._MEIPASS
+    else:
+        app_root = os.path.dirname(os.path.abspath(__file__))
+    return app_root
+
+def get_log_file_path():
+    home = os.path.expanduser("~")
+    if sys.platform == "darwin":
+        log_dir = os.path.join(home, "Library", "Logs", "ZQSFXAudioSplitter")
+    elif sys.platform == "win32":
+        log_dir = os.path.join(home, "AppData", "Local", "ZQSFXAudioSplitter", "Logs")
+    else:
+        log_dir = os.path.join(home, ".ZQSFXAudioSplitter", "logs")
+    os.makedirs(log_dir, exist_ok=True)
+    return os.path.join(log_dir, "app.log")
+
+def find_ffmpeg_paths():
+    """
+    Locate the bundled FFmpeg/FFprobe binaries, falling back to the system PATH.
+    Returns (None, None) for anything that is missing.
+    """
+    app_root = get_application_root()
+
+    if os.name == "nt":
+        ffmpeg_filename = "ffmpeg.exe"
+        ffprobe_filename = "ffprobe.exe"
+    else:
+        ffmpeg_filename = "ffmpeg"
+        ffprobe_filename = "ffprobe"
+
+    ffmpeg_path = os.path.join(app_root, "ffmpeg", ffmpeg_filename)
+    ffprobe_path = os.path.join(app_root, "ffmpeg", ffprobe_filename)
+
+    if not os.path.exists(ffmpeg_path):
+        logger.debug(f"FFmpeg not found in '{ffmpeg_path}'. Searching in system PATH.")
+        ffmpeg_path = shutil.which("ffmpeg")
+    if not os.path.exists(ffprobe_path):
+        logger.debug(
+            f"FFprobe not found in '{ffprobe_path}'. Searching in system PATH."
+        )
+        ffprobe_path = shutil.which("ffprobe")
+
+    logger.debug(f"FFmpeg Path: {ffmpeg_path}")
+    logger.debug(f"FFprobe Path: {ffprobe_path}")
+
+    if (
+        ffmpeg_path
+        and ffprobe_path
+        and os.path.exists(ffmpeg_path)
+        and os.path.exists(ffprobe_path)
+    ):
+        return ffmpeg_path, ffprobe_path
+    return None, None
+
+def get_detached_process_kwargs():
+    """
+    Popen arguments that start FFmpeg/FFprobe in a process group of their
+    own, so Ctrl+C only reaches the splitter, which then cancels and stops
+    them itself
+    """
+    if os.name == "nt":
+        return {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP}
+    return {"start_new_session": True}
+
+ffmpeg_path, ffprobe_path = find_ffmpeg_paths()
+
+# Bytes of interleaved audio read per block by the streaming engine
+DEFAULT_STREAM_BLOCK_SIZE = 4 * 1024 * 1024
+
+# Settings of a split, shared by every file of a batch
+DEFAULT_SPLIT_OPTIONS = {
+    "naming_scheme": "default",
+    "custom_names": [],
+    "override_bit_depth": None,
+    "override_sample_rate": None,
+    "resampler": "swr",  # see RESAMPLERS
+    "selected_channels": None,  # 0-based channel indexes, None for all
+    "channel_groups": None,  # group dicts from parse_channel_groups, used instead of selected_channels
+    "block_size": DEFAULT_STREAM_BLOCK_SIZE,
+    "verification": "off",
+    "debug_dumps": False,
+    "journal_path": None,  # SplitJournal database, None to keep no journal
+    "resume": True,  # skip outputs the journal shows are up to date
+    "silence_threshold_db": None,  # outputs peaking below this dBFS are silent, None to keep all
+    "silent_action": "skip",  # see SILENT_ACTIONS
+    "duplicate_action": None,  # see DUPLICATE_ACTIONS, None to keep bit-identical outputs
+    "analysis": None,  # sidecar format from ANALYSIS_FORMATS, None to skip the analysis
+    "bext_loudness": False,  # fill the bext loudness fields of outputs that have a bext chunk
+    "peak_files": False,  # write a PEAK_FILE_SUFFIX waveform overview next to every output
+}
+
+# What happens to silent outputs: skip removes them, quarantine moves them to SILENT_DIRNAME
+SILENT_ACTIONS = ("skip", "quarantine")
+SILENT_DIRNAME = "silent"
+
+# What happens to outputs bit-identical to an earlier output of the same
+# source: link replaces them with a hard link, manifest only lists them in
+# the source's DUPLICATES_MANIFEST_SUFFIX file
+DUPLICATE_ACTIONS = ("link", "manifest")
+DUPLICATES_MANIFEST_SUFFIX = "_duplicates.json"
+
+# Per-channel analysis sidecar in the output folder, one row per line in
+# either format so watch mode can append to it
+ANALYSIS_FORMATS = ("jsonl", "csv")
+ANALYSIS_FILENAME = "channel_analysis"
+ANALYSIS_FIELDS = (
+    "output",
+    "status",  # see ANALYSIS_STATUSES
+    "moved_to",  # where a quarantined silent output went
+    "source",
+    "channels",
+    "peak_dbfs",
+    "true_peak_dbtp",
+    "rms_dbfs",
+    "dc_offset",
+    "integrated_lufs",
+    "loudness_range_lu",
+    "max_momentary_lufs",
+    "max_short_term_lufs",
+)
+# What became of an analysed output: written as is, hard linked to a duplicate,
+# removed as silent, moved to SILENT_DIRNAME, or removed and listed as a duplicate
+ANALYSIS_STATUSES = ("written", "linked", "silent", "quarantined", "duplicate")
+
+def make_split_options(**options):
+    unknown = set(options) - set(DEFAULT_SPLIT_OPTIONS)
+    if unknown:
+        raise ValueError(f"Unknown split options: {', '.join(sorted(unknown))}")
+    return {**DEFAULT_SPLIT_OPTIONS, **options}
+
+# Options that describe where a batch runs rather than how files are split
+PRESET_EXCLUDED_OPTIONS = ("journal_path",)
+
+def load_split_preset(preset_path):
+    """
+    Read split options saved with save_split_preset. Unknown keys raise ValueError.
+    """
+    with open(preset_path, "r") as f:
+        preset = json.load(f)
+    make_split_options(**preset)
+    return preset
+
+def save_split_preset(preset_path, options):
+    preset = {
+        key: value for key, value in options.items() if key not in PRESET_EXCLUDED_OPTIONS
+    }
+    with open(preset_path, "w") as f:
+        json.dump(preset, f, indent=2)
+    logger.info(f"Saved split preset to {preset_path}")
+
+class StageTimer:
+    """
+    Collect timing spans of the stages of one file's split
+    (probe, metadata_read, encode, verify, debug_write, directory, journal)
+    """
+    def __init__(self):
+        self.spans = []
+
+    @contextmanager
+    def span(self, stage):
+        started = time.time()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.spans.append(
+                {"stage": stage, "start": started, "seconds": time.perf_counter() - start}
+            )
+
+class SplitCancelled(Exception):
+    """
+    Raised inside a split once its CancelToken has been cancelled
+    """
+
+class CancelToken:
+    """
+    Cancel and pause flags shared by the batch scheduler and the code that
+    streams audio. Built on multiprocessing events so batch worker
+    processes see a cancel or pause as soon as it is requested.
+    """
+    def __init__(self):
+        mp_context = multiprocessing.get_context("spawn")
+        self.cancelled = mp_context.Event()
+        self.running = mp_context.Event()
+        self.running.set()
+
+    def cancel(self):
+        self.cancelled.set()
+        # Wake anything waiting on a pause so it can see the cancel
+        self.running.set()
+
+    def pause(self):
+        self.running.clear()
+
+    def resume(self):
+        self.running.set()
+
+    def is_cancelled(self):
+        return self.cancelled.is_set()
+
+    def is_paused(self):
+        return not self.running.is_set()
+
+    def check(self):
+        """
+        Block while paused and raise SplitCancelled once cancelled
+        """
+        self.running.wait()
+        if self.cancelled.is_set():
+            raise SplitCancelled()
+
+def remove_partial_outputs(output_files):
+    for output_file in output_files:
+        try:
+            if os.path.exists(output_file):
+                os.remove(output_file)
+                logger.info(f"Removed partial output: {output_file}")
+        except OSError as e:
+            logger.error(f"Failed to remove partial output '{output_file}': {e}")
+
+
+def get_probe_cache_path():
+    return os.path.join(os.path.dirname(get_log_file_path()), "probe_cache.sqlite3")
+
+class ProbeCache:
+    """
+    On-disk cache of probe results keyed by (path, size, mtime), so files that
+    have not changed are never probed twice
+    """
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.lock = threading.Lock()
+        self.connection = None
+
+    def connect(self):
+        if self.connection is None:
+            self.connection = sqlite3.connect(
+                self.db_path, timeout=10, check_same_thread=False
+            )
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS probes ("
+                "path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, info TEXT)"
+            )
+            self.connection.commit()
+        return self.connection
+
+    def get(self, path, size, mtime_ns):
+        try:
+            with self.lock:
+                row = self.connect().execute(
+                    "SELECT info FROM probes WHERE path = ? AND size = ? AND mtime_ns = ?",
+                    (path, size, mtime_ns),
+                ).fetchone()
+            return json.loads(row[0]) if row else None
+        except Exception as e:
+            logger.error(f"Error reading probe cache: {e}")
+            logger.debug(traceback.format_exc())
+            return None
+
+    def put(self, path, size, mtime_ns, info):
+        try:
+            with self.lock:
+                connection = self.connect()
+                connection.execute(
+                    "INSERT OR REPLACE INTO probes (path, size, mtime_ns, info) VALUES (?, ?, ?, ?)",
+                    (path, size, mtime_ns, json.dumps(info)),
+                )
+                connection.commit()
+        except Exception as e:
+            logger.error(f"Error writing probe cache: {e}")
+            logger.debug(traceback.format_exc())
+
+probe_cache = None
+
+def get_probe_cache():
+    global probe_cache
+    if probe_cache is None:
+        probe_cache = ProbeCache(get_probe_cache_path())
+    return probe_cache
+
+def probe_audio_file(file_path, ffprobe_path):
+    """
+    Return channels, sample rate, sample format, bits per sample, duration and
+    data chunk position of the first audio stream. PCM/float WAV headers are
+    parsed natively; anything else takes a single ffprobe call.
+    Results are cached on disk until the file's size or mtime changes.
+    """
+    path = os.path.abspath(file_path)
+    stat = os.stat(path)
+    cache = get_probe_cache()
+    info = cache.get(path, stat.st_size, stat.st_mtime_ns)
+    if info is not None:
+        logger.debug(f"Probe cache hit for '{file_path}'")
+        return info
+
+    info = probe_wav_header(path)
+    if info is not None:
+        logger.debug(f"Probed '{file_path}' from its header: {info}")
+        cache.put(path, stat.st_size, stat.st_mtime_ns, info)
+        return info
+
+    cmd = [
+        ffprobe_path,
+        "-v", "error",
+        "-select_streams", "a:0",
+        "-show_entries",
+        "stream=codec_name,channels,sample_rate,sample_fmt,bits_per_sample,bits_per_raw_sample,duration",
+        "-of", "json",
+        path,
+    ]
+    output = subprocess.check_output(cmd, **get_detached_process_kwargs()).decode()
+    stream = json.loads(output)["streams"][0]
+    bits_per_sample = int(stream.get("bits_per_sample") or 0) or int(
+        stream.get("bits_per_raw_sample") or 0
+    )
+    layout = read_wav_layout(path)
+    info = {
+        "codec_name": stream.get("codec_name"),
+        "channels": int(stream["channels"]),
+        "sample_rate": int(stream.get("sample_rate") or 0),
+        "sample_fmt": stream.get("sample_fmt"),
+        "bits_per_sample": bits_per_sample or None,
+        "duration": float(stream["duration"]) if stream.get("duration") else None,
+        "data_offset": layout.get("data_offset") if layout else None,
+        "data_size": layout.get("data_size") if layout else None,
+        "channel_mask": layout.get("channel_mask") if layout else None,
+    }
+    logger.debug(f"Probed '{file_path}': {info}")
+    cache.put(path, stat.st_size, stat.st_mtime_ns, info)
+    return info
+
+def get_output_filename(base_name, channel_idx, naming_scheme, custom_names):
+    if isinstance(channel_idx, dict):
+        return get_group_filename(base_name, channel_idx)
+    if naming_scheme == "custom" and channel_idx < len(custom_names):
+        return f"{base_name}_{custom_names[channel_idx].strip()}.wav"
+    return f"{base_name}_chan{channel_idx + 1}.wav"
+
+def format_channel_list(channel_indexes):
+    """
+    1-based label for 0-based channel indexes, "3-7" when contiguous or "1+3"
+    """
+    channels = [channel_idx + 1 for channel_idx in channel_indexes]
+    if len(channels) > 1 and channels == list(range(channels[0], channels[-1] + 1)):
+        return f"{channels[0]}-{channels[-1]}"
+    return "+".join(str(channel) for channel in channels)
+
+def get_group_filename(base_name, group):
+    label = format_channel_list(group["channels"])
+    if group["layout"]:
+        return f"{base_name}_chan{label}_{group['layout']}.wav"
+    return f"{base_name}_chan{label}.wav"
+
+# Metadata verification policies: off, sampled (one output in VERIFY_SAMPLE_RATE) or full
+VERIFICATION_POLICIES = ("off", "sampled", "full")
+VERIFY_SAMPLE_RATE = 20
+
+def should_verify_output(output_file, verification):
+    if verification == "full":
+        return True
+    if verification == "sampled":
+        # Hash the name so every worker process picks the same outputs
+        return zlib.crc32(os.path.basename(output_file).encode()) % VERIFY_SAMPLE_RATE == 0
+    return False
+
+def verify_output_metadata(source_metadata, output_file, debug_dir=None):
+    """
+    Re-read an exported file and log any source metadata that did not survive.
+    The output metadata and any differences are dumped to debug_dir if given.
+    """
+    output_reader = WAVMetadataReader(output_file)
+    output_metadata = output_reader.metadata
+
+    # Log output metadata
+    output_name = os.path.splitext(os.path.basename(output_file))[0]
+    if debug_dir:
+        with open(os.path.join(debug_dir, f"output_metadata_{output_name}.txt"), "w") as f:
+            f.write(json.dumps(output_metadata, indent=2))
+
+    # Compare metadata (excluding technical fields that will change)
+    excluded_fields = {'Duration', 'Format', 'NumChannels', 'Version', 
+                     'Number of Channels', 'Sample Width', 'Frame Rate', 
+                     'Number of Frames'}
+    
+    preserved = all(
+        key in output_metadata and output_metadata[key] == value
+        for key, value in source_metadata.items()
+        if value and key not in excluded_fields
+    )
+
+    if not preserved:
+        logger.warning(f"Some metadata was not preserved in '{output_file}'")
+    if not preserved and debug_dir:
+        with open(os.path.join(debug_dir, f"metadata_diff_{output_name}.txt"), "w") as f:
+            f.write("=== Missing Metadata ===\n")
+            for key, value in source_metadata.items():
+                if value and key not in output_metadata:
+                    f.write(f"{key}: {value}\n")
+            f.write("\n=== Changed Metadata ===\n")
+            for key, value in source_metadata.items():
+                if value and key in output_metadata and output_metadata[key] != value:
+                    f.write(f"{key}:\n  Source: {value}\n  Output: {output_metadata[key]}\n")
+    return preserved
+
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_IEEE_FLOAT = 0x0003
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+# FFmpeg aresample engines: swr is built in, soxr trades CPU time for quality
+RESAMPLERS = ("swr", "soxr")
+
+def get_resample_filter(sample_rate, resampler="swr"):
+    if resampler not in RESAMPLERS:
+        raise ValueError(f"Unknown resampler: {resampler}")
+    if resampler == "soxr":
+        return f"aresample={sample_rate}:resampler=soxr:precision=28"
+    return f"aresample={sample_rate}"
+
+# Integer PCM bit depths outputs can be written in
+PCM_BIT_DEPTHS = (8, 16, 24, 32)
+
+# Raw PCM muxers FFmpeg uses to stream each (format_tag, bits_per_sample) output
+RAW_PCM_FORMATS = {
+    (WAVE_FORMAT_PCM, 8): "u8",
+    (WAVE_FORMAT_PCM, 16): "s16le",
+    (WAVE_FORMAT_PCM, 24): "s24le",
+    (WAVE_FORMAT_PCM, 32): "s32le",
+    (WAVE_FORMAT_IEEE_FLOAT, 32): "f32le",
+    (WAVE_FORMAT_IEEE_FLOAT, 64): "f64le",
+}
+
+# Sample format of each PCM codec ffprobe reports
+PCM_CODEC_FORMATS = {
+    "pcm_u8": (WAVE_FORMAT_PCM, 8),
+    "pcm_s16le": (WAVE_FORMAT_PCM, 16),
+    "pcm_s24le": (WAVE_FORMAT_PCM, 24),
+    "pcm_s32le": (WAVE_FORMAT_PCM, 32),
+    "pcm_f32le": (WAVE_FORMAT_IEEE_FLOAT, 32),
+    "pcm_f64le": (WAVE_FORMAT_IEEE_FLOAT, 64),
+}
+
+# Keys FFmpeg writes to its -progress stream
+FFMPEG_PROGRESS_KEYS = {
+    "frame", "fps", "bitrate", "total_size", "out_time_us", "out_time_ms",
+    "out_time", "dup_frames", "drop_frames", "speed", "progress",
+}
+
+def read_ffmpeg_stderr(stream, stderr_lines, on_out_time=None):
+    """
+    Collect FFmpeg's stderr, passing the decoded position from its
+    -progress key=value lines to on_out_time(seconds) as they arrive.
+    """
+    for line in iter(stream.readline, b''):
+        key, separator, value = line.decode(errors="replace").strip().partition("=")
+        if separator and (key in FFMPEG_PROGRESS_KEYS or key.startswith("stream_")):
+            if key == "out_time_us" and on_out_time and value.isdigit():
+                on_out_time(int(value) / 1000000)
+            continue
+        stderr_lines.append(line)
+
+def run_ffmpeg_multi_output(
+    input_file,
+    channel_outputs,
+    override_bit_depth=None,
+    override_sample_rate=None,
+    block_size=None,
+    debug_dumps=False,
+    timer=None,
+    progress_callback=None,
+    cancel_token=None,
+    resampler="swr",
+    levels=None,
+    digests=None,
+    loudness=False,
+    peak_cache=False,
+):
+    """
+    Split several channels of one source with a single FFmpeg process.
+    FFmpeg decodes the source once, picks the selected channels, resamples
+    them in one filter with the given resampler and converts them to the
+    output format as one interleaved raw PCM stream. Every
+    (channel_idx, output_file) pair is written from that stream with the
+    source metadata chunks copied in byte for byte. With debug_dumps the
+    source metadata, command and errors are written to debug_metadata/.
+    progress_callback receives source bytes as FFmpeg's -progress output
+    reports how far it has decoded. A cancelled cancel_token kills FFmpeg
+    and raises SplitCancelled. When levels is a dict, the peak, RMS and DC
+    offset of every output are stored in it by output file, with loudness
+    and true peak too if loudness is set, and with peak_cache set a
+    waveform overview is streamed to a peak file next to every output;
+    digests, if a dict, likewise receives the hash of every output's sample
+    data.
+    """
+    timer = timer or StageTimer()
+    writers = []
+    process = None
+    level_meter = None
+    try:
+        if not channel_outputs:
+            return True
+
+        debug_dir = None
+        if debug_dumps:
+            with timer.span("debug_write"):
+                # Create debug directory for logging
+                debug_dir = get_debug_metadata_dir(channel_outputs[0][1])
+
+                # Read all metadata using the improved WAVMetadataReader
+                reader = WAVMetadataReader(input_file)
+                source_metadata = reader.metadata
+
+                # Log source metadata
+                with open(os.path.join(debug_dir, "source_metadata.txt"), "w") as f:
+                    f.write(json.dumps(source_metadata, indent=2))
+
+        with timer.span("metadata_read"):
+            layout = read_wav_layout(input_file)
+            chunks = read_passthrough_chunks(input_file, layout) if layout else []
+        with timer.span("probe"):
+            source_info = probe_audio_file(input_file, ffprobe_path)
+        if layout and layout.get('format_tag') in (WAVE_FORMAT_PCM, WAVE_FORMAT_IEEE_FLOAT):
+            source_format = (layout['format_tag'], layout['bits_per_sample'])
+        else:
+            source_format = PCM_CODEC_FORMATS.get(source_info["codec_name"])
+        out_format, out_bits = get_output_format(override_bit_depth, source_format)
+        sample_rate = override_sample_rate or source_info["sample_rate"]
+        source_bytes = get_audio_data_size(input_file)
+        reported_bytes = [0]
+
+        def on_out_time(seconds):
+            # Map the decoded position back to source bytes for batch progress
+            if not progress_callback or not source_info["duration"]:
+                return
+            position = min(int(seconds / source_info["duration"] * source_bytes), source_bytes)
+            if position > reported_bytes[0]:
+                progress_callback(position - reported_bytes[0])
+                reported_bytes[0] = position
+
+        # One pan filter selects the channels of every output in output order
+        pan_channels = []
+        for channel, _ in channel_outputs:
+            pan_channels.extend(get_output_channels(channel))
+        filters = ["|".join(
+            [f"pan={len(pan_channels)}c"]
+            + [f"c{idx}=c{channel_idx}" for idx, channel_idx in enumerate(pan_channels)]
+        )]
+        # Resample once per source after the pan, so only exported channels
+        # are converted and every output shares the same filter
+        if override_sample_rate and override_sample_rate != source_info["sample_rate"]:
+            filters.append(get_resample_filter(override_sample_rate, resampler))
+        cmd = [
+            ffmpeg_path,
+            '-v', 'error',
+            '-nostats',
+            '-progress', 'pipe:2',
+            '-i', input_file,
+            '-map', '0:a:0',       # Map first audio stream
+            '-af', ",".join(filters),
+        ]
+        cmd.extend(['-f', RAW_PCM_FORMATS[(out_format, out_bits)], 'pipe:1'])
+
+        # Log full command
+        if debug_dir:
+            with timer.span("debug_write"):
+                with open(os.path.join(debug_dir, "ffmpeg_command.txt"), "w") as f:
+                    f.write(" ".join(cmd))
+
+        with timer.span("encode"):
+            position = 0
+            for channel, output_file in channel_outputs:
+                channel_indexes = get_output_channels(channel)
+                positions = list(range(position, position + len(channel_indexes)))
+                position += len(channel_indexes)
+                writers.append(
+                    (
+                        positions[0] if isinstance(channel, int) else positions,
+                        WAVChannelWriter(
+                            output_file,
+                            sample_rate,
+                            out_bits,
+                            get_output_chunks(chunks, channel_indexes),
+                            out_format,
+                            len(channel_indexes),
+                            get_output_channel_mask(channel),
+                            hash_data=digests is not None,
+                        ),
+                    )
+                )
+
+            # Execute command
+            process = subprocess.Popen(
+                cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, **get_detached_process_kwargs()
+            )
+            stderr_output = []
+            stderr_thread = threading.Thread(
+                target=read_ffmpeg_stderr,
+                args=(process.stderr, stderr_output, on_out_time),
+                daemon=True,
+            )
+            stderr_thread.start()
+            if levels is not None:
+                level_meter = ChannelLevelMeter(
+                    out_format,
+                    out_bits,
+                    [len(get_output_channels(channel)) for channel, _ in channel_outputs],
+                    sample_rate,
+                    loudness,
+                    [writer.output_file for _, writer in writers] if peak_cache else None,
+                )
+            stream_channel_blocks(
+                process.stdout,
+                None,
+                len(pan_channels),
+                out_bits // 8,
+                writers,
+                block_size=block_size,
+                cancel_token=cancel_token,
+                level_meter=level_meter,
+            )
+            process.wait()
+            stderr_thread.join()
+        if cancel_token:
+            # A cancel that ended the stream is not an FFmpeg failure
+            cancel_token.check()
+        if process.returncode != 0:
+            stderr = b"".join(stderr_output).decode(errors="replace")
+            logger.error(f"FFmpeg error: {stderr}")
+            if debug_dir:
+                with timer.span("debug_write"):
+                    with open(os.path.join(debug_dir, "error.txt"), "w") as f:
+                        f.write(stderr)
+            return False
+
+        if level_meter:
+            for idx, (_, writer) in enumerate(writers):
+                levels[writer.output_file] = level_meter.get_levels(idx)
+        if digests is not None:
+            for _, writer in writers:
+                digests[writer.output_file] = (
+                    writer.get_data_digest(),
+                    writer.get_metadata_digest(),
+                )
+        if progress_callback and source_bytes > reported_bytes[0]:
+            progress_callback(source_bytes - reported_bytes[0])
+        return True
+
+    except SplitCancelled:
+        if process and process.poll() is None:
+            process.kill()
+            process.wait()
+        raise
+    except Exception as e:
+        logger.error(f"Error: {str(e)}")
+        traceback.print_exc()
+        if process and process.poll() is None:
+            process.kill()
+        return False
+    finally:
+        for _, writer in writers:
+            writer.close()
+        if level_meter:
+            level_meter.close()
+
+def run_ffmpeg_with_metadata(
+    input_file,
+    channel_idx,
+    output_file,
+    override_bit_depth=None,
+    override_sample_rate=None,
+    resampler="swr",
+):
+    """
+    Process a single channel and preserve all metadata from source to output file
+    The source metadata chunks are copied into the output byte for byte
+    """
+    return run_ffmpeg_multi_output(
+        input_file,
+        [(channel_idx, output_file)],
+        override_bit_depth,
+        override_sample_rate,
+        resampler=resampler,
+    )
+
+# SubFormat GUID of WAVE_FORMAT_EXTENSIBLE after its leading format tag
+KSDATAFORMAT_SUBTYPE_SUFFIX = b'\x00\x00\x00\x00\x10\x00\x80\x00\x00\xaa\x00\x38\x9b\x71'
+
+# Largest size a 32-bit RIFF field can hold before RF64 is needed
+MAX_RIFF_SIZE = 0xFFFFFFFF
+
+def is_wave_header(header):
+    return (
+        len(header) >= 12
+        and header[:4] in (b'RIFF', b'RF64', b'BW64')
+        and header[8:12] == b'WAVE'
+    )
+
+def iter_wav_chunks(file):
+    """
+    Yield (chunk_id, offset, size) for every chunk of an open RIFF/RF64 WAVE file.
+    Sizes of 0xFFFFFFFF are resolved through the ds64 chunk, pad bytes are
+    skipped and only the 8-byte chunk headers (plus ds64) are read.
+    """
+    file.seek(0, os.SEEK_END)
+    file_size = file.tell()
+    file.seek(0)
+    if not is_wave_header(file.read(12)):
+        return
+
+    ds64_sizes = {}
+    position = 12
+    while position + 8 <= file_size:
+        file.seek(position)
+        chunk_id, chunk_size = struct.unpack('<4sI', file.read(8))
+        offset = position + 8
+        if chunk_id == b'ds64' and chunk_size >= 28:
+            # RF64 keeps the real 64-bit sizes in the ds64 chunk
+            _, data_size, _, table_length = struct.unpack('<QQQI', file.read(28))
+            ds64_sizes[b'data'] = data_size
+            for _ in range(min(table_length, (chunk_size - 28) // 12)):
+                table_id, table_size = struct.unpack('<4sQ', file.read(12))
+                ds64_sizes[table_id] = table_size
+        elif chunk_size == MAX_RIFF_SIZE and chunk_id in ds64_sizes:
+            chunk_size = ds64_sizes[chunk_id]
+        # Recorders that were stopped abruptly leave an oversized data chunk
+        chunk_size = min(chunk_size, file_size - offset)
+        yield chunk_id, offset, chunk_size
+        # Chunks are word aligned
+        position = offset + chunk_size + (chunk_size & 1)
+
+def read_wav_layout(filepath):
+    """
+    Walk the RIFF/RF64 chunks of a WAV file and return its sample format, the
+    position of the data chunk and the list of (chunk_id, offset, size) entries.
+    Returns None if the file is not a RIFF/WAVE file.
+    """
+    try:
+        with open(filepath, 'rb') as file:
+            header = file.read(12)
+            if not is_wave_header(header):
+                return None
+
+            layout = {'chunks': [], 'rf64': header[:4] != b'RIFF'}
+            for chunk_id, offset, chunk_size in iter_wav_chunks(file):
+                layout['chunks'].append((chunk_id, offset, chunk_size))
+
+                if chunk_id == b'fmt ':
+                    file.seek(offset)
+                    fmt = file.read(min(chunk_size, 40))
+                    (
+                        format_tag,
+                        channels,
+                        sample_rate,
+                        _,
+                        block_align,
+                        bits_per_sample,
+                    ) = struct.unpack('<HHIIHH', fmt[:16])
+                    channel_mask = None
+                    if format_tag == WAVE_FORMAT_EXTENSIBLE and len(fmt) >= 26:
+                        channel_mask = struct.unpack('<I', fmt[20:24])[0]
+                        # The first two bytes of the SubFormat GUID hold the real format tag
+                        format_tag = struct.unpack('<H', fmt[24:26])[0]
+                    layout['format_tag'] = format_tag
+                    layout['channel_mask'] = channel_mask
+                    layout['channels'] = channels
+                    layout['sample_rate'] = sample_rate
+                    layout['block_align'] = block_align
+                    layout['bits_per_sample'] = bits_per_sample
+                elif chunk_id == b'data':
+                    layout['data_offset'] = offset
+                    layout['data_size'] = chunk_size
+            return layout
+    except Exception as e:
+        logger.error(f"Error reading WAV layout of '{filepath}': {e}")
+        logger.debug(traceback.format_exc())
+        return None
+
+# Speaker positions in WAVE_FORMAT_EXTENSIBLE channel mask bit order
+SPEAKER_NAMES = [
+    "FL", "FR", "FC", "LFE", "BL", "BR", "FLC", "FRC", "BC",
+    "SL", "SR", "TC", "TFL", "TFC", "TFR", "TBL", "TBC", "TBR",
+]
+
+# WAVE_FORMAT_EXTENSIBLE channel masks of the layouts a channel group can take
+CHANNEL_LAYOUT_MASKS = {
+    "mono": 0x4,
+    "stereo": 0x3,
+    "2.1": 0xB,
+    "3.0": 0x7,
+    "quad": 0x33,
+    "4.0": 0x107,
+    "5.0": 0x37,
+    "5.0(side)": 0x607,
+    "5.1": 0x3F,
+    "5.1(side)": 0x60F,
+    "7.0": 0x637,
+    "7.1": 0x63F,
+}
+
+def parse_channel_groups(spec):
+    """
+    Parse a channel group map such as "1-2:stereo,3-7:5.0,8:mono" into a list
+    of {"channels": [0-based indexes], "layout": name or None} dicts.
+    Channels are 1-based ranges, or lists joined with '+' like "1+3"; a group
+    without a layout is written with an empty channel mask, as for M/S pairs.
+    Raises ValueError for malformed groups or a layout of the wrong size.
+    """
+    groups = []
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        channel_spec, _, layout = part.partition(":")
+        layout = layout.strip() or None
+        channels = []
+        try:
+            for item in channel_spec.split("+"):
+                if "-" in item:
+                    start, end = (int(bound) for bound in item.split("-", 1))
+                else:
+                    start = end = int(item)
+                if start < 1 or end < start:
+                    raise ValueError
+                channels.extend(range(start - 1, end))
+        except ValueError:
+            raise ValueError(f"Invalid channel group: '{part}'")
+        if layout is not None:
+            if layout not in CHANNEL_LAYOUT_MASKS:
+                raise ValueError(f"Unknown channel layout '{layout}' in group '{part}'")
+            expected = bin(CHANNEL_LAYOUT_MASKS[layout]).count("1")
+            if len(channels) != expected:
+                raise ValueError(
+                    f"Layout '{layout}' needs {expected} channels, group '{part}' has {len(channels)}"
+                )
+        groups.append({"channels": channels, "layout": layout})
+    if not groups:
+        raise ValueError("No channel groups given")
+    return groups
+
+def get_group_outputs(channel_groups, total_channels):
+    """
+    Turn channel groups into the channel entries of channel_outputs: plain
+    0-based indexes for mono groups, so they come out like an ordinary split,
+    and the group dict for interleaved ones. Groups reaching past the last
+    channel of the source are left out.
+    """
+    outputs = []
+    for group in channel_groups:
+        if max(group["channels"]) >= total_channels:
+            logger.warning(
+                f"Skipping channel group {format_channel_list(group['channels'])}: "
+                f"the source has {total_channels} channel(s)"
+            )
+            continue
+        if len(group["channels"]) == 1 and group["layout"] in (None, "mono"):
+            outputs.append(group["channels"][0])
+        else:
+            outputs.append(group)
+    return outputs
+
+def get_output_channels(channel):
+    """
+    Source channel indexes written to one output, given its entry in channel_outputs
+    """
+    return list(channel["channels"]) if isinstance(channel, dict) else [channel]
+
+def get_output_channel_mask(channel):
+    if not isinstance(channel, dict):
+        return None
+    return CHANNEL_LAYOUT_MASKS.get(channel["layout"], 0)
+
+def get_channel_labels(channel_mask, channels):
+    """
+    Speaker label for each channel from an extensible channel mask, or None
+    where the mask does not describe the channel
+    """
+    labels = []
+    if channel_mask:
+        for bit, name in enumerate(SPEAKER_NAMES):
+            if channel_mask & (1 << bit):
+                labels.append(name)
+    labels = labels[:channels]
+    return labels + [None] * (channels - len(labels))
+
+def probe_wav_header(file_path):
+    """
+    Spawn-free probe of PCM/float WAV, BWF and RF64 files from their headers.
+    Returns the same fields as probe_audio_file, or None for anything that
+    needs ffprobe.
+    """
+    layout = read_wav_layout(file_path)
+    if not layout or 'format_tag' not in layout or 'data_offset' not in layout:
+        return None
+    format_tag = layout['format_tag']
+    bits_per_sample = layout['bits_per_sample']
+    if format_tag == WAVE_FORMAT_PCM:
+        formats = {8: ("pcm_u8", "u8"), 16: ("pcm_s16le", "s16"), 24: ("pcm_s24le", "s32"), 32: ("pcm_s32le", "s32")}
+    elif format_tag == WAVE_FORMAT_IEEE_FLOAT:
+        formats = {32: ("pcm_f32le", "flt"), 64: ("pcm_f64le", "dbl")}
+    else:
+        return None
+    if bits_per_sample not in formats or not layout['channels'] or not layout['block_align']:
+        return None
+    codec_name, sample_fmt = formats[bits_per_sample]
+    frames = layout['data_size'] // layout['block_align']
+    return {
+        "codec_name": codec_name,
+        "channels": layout['channels'],
+        "sample_rate": layout['sample_rate'],
+        "sample_fmt": sample_fmt,
+        "bits_per_sample": bits_per_sample,
+        "duration": frames / layout['sample_rate'] if layout['sample_rate'] else None,
+        "data_offset": layout['data_offset'],
+        "data_size": layout['data_size'],
+        "channel_mask": layout['channel_mask'],
+    }
+
+# Chunks that describe the audio layout; every output writes its own
+STRUCTURAL_CHUNK_IDS = {
+    b'fmt ', b'data', b'ds64', b'fact', b'levl', b'JUNK', b'junk', b'PAD ', b'FLLR',
+}
+
+def read_passthrough_chunks(input_file, layout):
+    """
+    Raw (chunk_id, data) pairs for every metadata chunk of the source: bext,
+    iXML, axml, cue, LIST and any vendor chunk. Only the chunks describing
+    the audio layout are left out.
+    """
+    chunks = []
+    with open(input_file, 'rb') as f:
+        for chunk_id, offset, size in layout['chunks']:
+            if chunk_id in STRUCTURAL_CHUNK_IDS:
+                continue
+            f.seek(offset)
+            chunks.append((chunk_id, f.read(size)))
+    return chunks
+
+def trim_ixml_tracks(xml_data, channel_indexes):
+    """
+    Keep only the iXML TRACK_LIST entries of the exported source channels,
+    renumbered to their position in the output. Other iXML is left untouched.
+    """
+    try:
+        root = ET.fromstring(xml_data.decode('utf-8', errors='ignore').strip('\x00 \r\n'))
+        track_list = root.find('TRACK_LIST')
+        if track_list is None:
+            return xml_data
+
+        tracks = {}
+        for track in track_list.findall('TRACK'):
+            index = track.findtext('INTERLEAVE_INDEX') or track.findtext('CHANNEL_INDEX')
+            try:
+                tracks[int(index) - 1] = track
+            except (TypeError, ValueError):
+                pass
+            track_list.remove(track)
+
+        kept = 0
+        for channel_idx in channel_indexes:
+            track = tracks.get(channel_idx)
+            if track is None:
+                continue
+            kept += 1
+            interleave_index = track.find('INTERLEAVE_INDEX')
+            if interleave_index is not None:
+                interleave_index.text = str(kept)
+            track_list.append(track)
+
+        track_count = track_list.find('TRACK_COUNT')
+        if track_count is not None:
+            track_count.text = str(kept)
+        return b'<?xml version="1.0" encoding="UTF-8"?>\n' + ET.tostring(root, encoding='utf-8')
+    except Exception as e:
+        logger.error(f"Error trimming iXML track list: {e}")
+        return xml_data
+
+def get_output_chunks(chunks, channel_indexes):
+    """
+    Passthrough chunks for one output, with the iXML track list trimmed to the
+    exported channels
+    """
+    return [
+        (chunk_id, trim_ixml_tracks(data, channel_indexes) if chunk_id == b'iXML' else data)
+        for chunk_id, data in chunks
+    ]
+
+def get_output_format(override_bit_depth=None, source_format=None):
+    """
+    (format_tag, bits_per_sample) the outputs are written in. A bit depth
+    override always writes integer PCM; otherwise the source format given
+    as (format_tag, bits_per_sample) is matched, so 16-bit sources stay
+    16-bit and float sources stay float. Sources without a WAV sample
+    format, such as compressed audio, fall back to 24-bit PCM.
+    """
+    if override_bit_depth in PCM_BIT_DEPTHS:
+        return WAVE_FORMAT_PCM, override_bit_depth
+    if source_format in RAW_PCM_FORMATS:
+        return source_format
+    return WAVE_FORMAT_PCM, 24
+
+def can_split_natively(layout, override_bit_depth=None, override_sample_rate=None):
+    """
+    Check whether a source can be split by the NumPy engine without FFmpeg
+    """
+    if not layout or 'format_tag' not in layout or 'data_offset' not in layout:
+        return False
+    format_tag = layout['format_tag']
+    bits_per_sample = layout['bits_per_sample']
+    if format_tag == WAVE_FORMAT_PCM:
+        if bits_per_sample not in PCM_BIT_DEPTHS:
+            return False
+    elif format_tag == WAVE_FORMAT_IEEE_FLOAT:
+        if bits_per_sample not in (32, 64):
+            return False
+    else:
+        return False
+    if layout['block_align'] != layout['channels'] * (bits_per_sample // 8):
+        return False
+    # Resampling needs FFmpeg
+    if override_sample_rate and override_sample_rate != layout['sample_rate']:
+        return False
+    return True
+
+def unpack_pcm_samples(samples, format_tag, bits_per_sample):
+    """
+    Decode a (frames, bytes_per_sample) uint8 view of one channel into
+    left-justified int32 samples, or into floats for IEEE float sources
+    """
+    if format_tag == WAVE_FORMAT_IEEE_FLOAT:
+        dtype = '<f4' if bits_per_sample == 32 else '<f8'
+        return np.ascontiguousarray(samples).view(dtype).ravel()
+    if bits_per_sample == 8:
+        return (samples[:, 0].astype(np.int32) - 128) << 24
+    if bits_per_sample == 16:
+        return np.ascontiguousarray(samples).view('<i2').ravel().astype(np.int32) << 16
+    if bits_per_sample == 24:
+        padded = np.zeros((len(samples), 4), dtype=np.uint8)
+        padded[:, 1:] = samples
+        return padded.view('<i4').ravel()
+    return np.ascontiguousarray(samples).view('<i4').ravel()
+
+class ChannelLevelMeter:
+    """
+    Running peak, RMS and DC offset of every output of a split, measured on
+    the same blocks that are written. channel_counts gives the channels of
+    each output in writer order. With loudness set, a LoudnessMeter per
+    output adds BS.1770 loudness and true peak. peak_files, a list of
+    output files in writer order, streams a WaveformPeakCache overview of
+    every output to its PEAK_FILE_SUFFIX file. Levels are linear, 1.0
+    being full scale.
+    """
+    def __init__(
+        self,
+        format_tag,
+        bits_per_sample,
+        channel_counts,
+        sample_rate=None,
+        loudness=False,
+        peak_files=None,
+    ):
+        self.format_tag = format_tag
+        self.bits_per_sample = bits_per_sample
+        self.channel_counts = list(channel_counts)
+        self.peaks = [0.0] * len(self.channel_counts)
+        self.sum_squares = [0.0] * len(self.channel_counts)
+        self.counts = [0] * len(self.channel_counts)
+        self.sums = [np.zeros(channels) for channels in self.channel_counts]
+        self.loudness_meters = None
+        if loudness:
+            self.loudness_meters = [
+                LoudnessMeter(sample_rate, channels) for channels in self.channel_counts
+            ]
+        self.peak_caches = None
+        if peak_files:
+            self.peak_caches = []
+            for output_file, channels in zip(peak_files, self.channel_counts):
+                try:
+                    self.peak_caches.append(
+                        WaveformPeakCache(output_file + PEAK_FILE_SUFFIX, sample_rate, channels)
+                    )
+                except Exception:
+                    self.close()
+                    raise
+
+    def add(self, idx, samples):
+        values = unpack_pcm_samples(samples, self.format_tag, self.bits_per_sample)
+        if not len(values):
+            return
+        values = values.astype(np.float64)
+        if self.format_tag != WAVE_FORMAT_IEEE_FLOAT:
+            # Integer samples are left-justified in 32 bits
+            values /= 2147483648.0
+        self.peaks[idx] = max(self.peaks[idx], float(np.max(np.abs(values))))
+        self.sum_squares[idx] += float(np.dot(values, values))
+        self.counts[idx] += len(values)
+        frames = values.reshape(-1, self.channel_counts[idx])
+        self.sums[idx] += frames.sum(axis=0)
+        if self.loudness_meters:
+            self.loudness_meters[idx].add(frames)
+        if self.peak_caches:
+            self.peak_caches[idx].add(frames)
+
+    def get_levels(self, idx):
+        count = self.counts[idx]
+        frames = count // self.channel_counts[idx]
+        # The channel furthest off centre stands for a group
+        offsets = self.sums[idx] / frames if frames else self.sums[idx]
+        levels = {
+            "channels": self.channel_counts[idx],
+            "peak": self.peaks[idx],
+            "rms": math.sqrt(self.sum_squares[idx] / count) if count else 0.0,
+            "dc_offset": float(offsets[np.argmax(np.abs(offsets))]),
+        }
+        if self.loudness_meters:
+            levels.update(self.loudness_meters[idx].get_stats())
+        levels["true_peak"] = max(levels.get("true_peak", 0.0), levels["peak"])
+        if self.peak_caches:
+            levels["peak_file"] = self.peak_caches[idx].finish()
+        return levels
+
+    def close(self):
+        """
+        Remove the peak files of a split that did not finish
+        """
+        for peak_cache in self.peak_caches or []:
+            peak_cache.discard()
+
+# Samples per min/max pair of each waveform overview level, finest first; every
+# level is a multiple of the one before, from which it is decimated
+PEAK_CACHE_RESOLUTIONS = (256, 4096, 65536)
+PEAK_FILE_SUFFIX = ".peaks"
+PEAK_FILE_MAGIC = b"ZQPK"
+PEAK_FILE_VERSION = 1
+PEAK_FILE_HEADER = '<4sHHIQH'
+PEAK_FILE_LEVEL = '<IQ'
+# Coarse pairs decimated per read of the level below when a peak file is finished
+PEAK_DECIMATE_PAIRS = 4096
+
+def to_peak_values(values, rounding):
+    # Minima are rounded down and maxima up so the overview never understates a peak
+    return np.clip(rounding(values * 32767.0), -32768, 32767).astype(np.int16)
+
+class WaveformPeakCache:
+    """
+    Min/max overview of one output at every PEAK_CACHE_RESOLUTIONS level,
+    streamed to peak_path. Each block is decimated to the finest level with
+    one reshape and its pairs are appended to the file at once, keeping
+    only the frames of an unfinished pair for the next block; finish then
+    decimates each coarser level from the one before it, reading it back in
+    chunks, so memory stays constant however long the output is.
+
+    The little-endian file starts with PEAK_FILE_MAGIC, the version,
+    channels, sample rate, frames and level count (PEAK_FILE_HEADER),
+    followed by the samples per pair and pair count of each level
+    (PEAK_FILE_LEVEL) and then the pairs of each level in turn, as int16
+    min and max per channel scaled so 32767 is full scale.
+    """
+    def __init__(self, peak_path, sample_rate, channels):
+        self.peak_path = peak_path
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.frames = 0
+        self.pairs = 0
+        self.pending = np.empty((0, channels))
+        self.data_offset = struct.calcsize(PEAK_FILE_HEADER) + len(PEAK_CACHE_RESOLUTIONS) * struct.calcsize(PEAK_FILE_LEVEL)
+        self.file = open(peak_path, "w+b")
+        # The header is written last, once the pair counts are known
+        self.file.write(bytes(self.data_offset))
+
+    def write_pairs(self, frames):
+        # Whole pairs from a block, or the short last pair from finish
+        pairs = frames.reshape(-1, min(len(frames), PEAK_CACHE_RESOLUTIONS[0]), self.channels)
+        self.file.write(np.stack(
+            (to_peak_values(pairs.min(axis=1), np.floor), to_peak_values(pairs.max(axis=1), np.ceil)),
+            axis=-1,
+        ).astype('<i2').tobytes())
+        self.pairs += len(pairs)
+
+    def add(self, frames):
+        self.frames += len(frames)
+        if len(self.pending):
+            frames = np.concatenate((self.pending, frames))
+        step = PEAK_CACHE_RESOLUTIONS[0]
+        full = len(frames) // step * step
+        if full:
+            self.write_pairs(frames[:full])
+        # Copied so the rest of the block can be freed
+        self.pending = frames[full:].copy()
+
+    def finish(self):
+        """
+        Write the coarser levels and the header and close the file.
+        Returns the path of the peak file.
+        """
+        if len(self.pending):
+            self.write_pairs(self.pending)
+            self.pending = np.empty((0, self.channels))
+        pair_size = self.channels * 4
+        counts = [self.pairs]
+        offsets = [self.data_offset]
+        for previous, samples_per_peak in zip(PEAK_CACHE_RESOLUTIONS, PEAK_CACHE_RESOLUTIONS[1:]):
+            factor = samples_per_peak // previous
+            source_offset, source_count = offsets[-1], counts[-1]
+            offsets.append(source_offset + source_count * pair_size)
+            count = 0
+            for start in range(0, source_count, factor * PEAK_DECIMATE_PAIRS):
+                chunk_count = min(factor * PEAK_DECIMATE_PAIRS, source_count - start)
+                self.file.seek(source_offset + start * pair_size)
+                pairs = np.frombuffer(
+                    self.file.read(chunk_count * pair_size), dtype='<i2'
+                ).reshape(-1, self.channels, 2)
+                # A short last group is reduced on its own
+                groups = [pairs[:chunk_count // factor * factor].reshape(-1, factor, self.channels, 2)]
+                if chunk_count % factor:
+                    groups.append(pairs[chunk_count // factor * factor:][np.newaxis])
+                self.file.seek(0, os.SEEK_END)
+                for group in groups:
+                    if not group.shape[0]:
+                        continue
+                    self.file.write(np.stack(
+                        (group[..., 0].min(axis=1), group[..., 1].max(axis=1)), axis=-1
+                    ).astype('<i2').tobytes())
+                    count += group.shape[0]
+            counts.append(count)
+        self.file.seek(0)
+        self.file.write(struct.pack(
+            PEAK_FILE_HEADER,
+            PEAK_FILE_MAGIC,
+            PEAK_FILE_VERSION,
+            self.channels,
+            self.sample_rate or 0,
+            self.frames,
+            len(PEAK_CACHE_RESOLUTIONS),
+        ))
+        for samples_per_peak, count in zip(PEAK_CACHE_RESOLUTIONS, counts):
+            self.file.write(struct.pack(PEAK_FILE_LEVEL, samples_per_peak, count))
+        self.file.close()
+        return self.peak_path
+
+    def discard(self):
+        if not self.file.closed:
+            self.file.close()
+            try:
+                os.remove(self.peak_path)
+            except OSError as e:
+                logger.error(f"Failed to remove partial peak file '{self.peak_path}': {e}")
+
+# ITU-R BS.1770 K-weighting: a high shelf (Hz, dB, Q) followed by a high pass (Hz, Q)
+K_WEIGHTING_SHELF = (1681.974450955533, 3.999843853973347, 0.7071752369554196)
+K_WEIGHTING_HIGH_PASS = (38.13547087602444, 0.5003270373238773)
+# Seconds of the K-weighting impulse response kept for block-wise FFT filtering
+K_WEIGHTING_FIR_SECONDS = 0.1
+# True peak is measured on a 4x oversampled signal, as BS.1770 Annex 2 suggests
+TRUE_PEAK_OVERSAMPLING = 4
+TRUE_PEAK_TAPS = 48
+# Loudness is gated on 400 ms blocks stepped by 100 ms and short-term on 3 s windows
+LOUDNESS_HOP_SECONDS = 0.1
+# Blocks at or below this LUFS are silence, not a measurement
+LOUDNESS_ABSOLUTE_GATE = -70
+MOMENTARY_HOPS = 4
+SHORT_TERM_HOPS = 30
+
+k_weighting_filters = {}
+
+def apply_biquad(values, b, a):
+    # Plain difference equation; only used once per rate to build a FIR
+    b0, b1, b2 = (coefficient / a[0] for coefficient in b)
+    _, a1, a2 = (coefficient / a[0] for coefficient in a)
+    output = np.zeros(len(values))
+    x1 = x2 = y1 = y2 = 0.0
+    for n, x0 in enumerate(values):
+        y0 = b0 * x0 + b1 * x1 + b2 * x2 - a1 * y1 - a2 * y2
+        x2, x1 = x1, x0
+        y2, y1 = y1, y0
+        output[n] = y0
+    return output
+
+def get_k_weighting_filter(sample_rate):
+    """
+    Truncated impulse response of the K-weighting filter at sample_rate
+    """
+    if sample_rate not in k_weighting_filters:
+        frequency, gain_db, q = K_WEIGHTING_SHELF
+        k = math.tan(math.pi * frequency / sample_rate)
+        high_gain = 10 ** (gain_db / 20)
+        band_gain = high_gain ** 0.4996667741545416
+        shelf = (
+            [high_gain + band_gain * k / q + k * k, 2 * (k * k - high_gain), high_gain - band_gain * k / q + k * k],
+            [1 + k / q + k * k, 2 * (k * k - 1), 1 - k / q + k * k],
+        )
+        frequency, q = K_WEIGHTING_HIGH_PASS
+        k = math.tan(math.pi * frequency / sample_rate)
+        a0 = 1 + k / q + k * k
+        high_pass = ([1.0, -2.0, 1.0], [1.0, 2 * (k * k - 1) / a0, (1 - k / q + k * k) / a0])
+        response = np.zeros(max(1, int(sample_rate * K_WEIGHTING_FIR_SECONDS)))
+        response[0] = 1.0
+        for b, a in (shelf, high_pass):
+            response = apply_biquad(response, b, a)
+        k_weighting_filters[sample_rate] = response
+    return k_weighting_filters[sample_rate]
+
+def get_true_peak_phases():
+    """
+    Polyphase windowed-sinc interpolator, one row of taps per output phase
+    """
+    taps = np.arange(TRUE_PEAK_TAPS) - (TRUE_PEAK_TAPS - 1) / 2
+    response = np.sinc(taps / TRUE_PEAK_OVERSAMPLING) * np.kaiser(TRUE_PEAK_TAPS, 8.0)
+    phases = response.reshape(-1, TRUE_PEAK_OVERSAMPLING).T
+    return phases / phases.sum(axis=1, keepdims=True)
+
+def power_to_lufs(power):
+    return -0.691 + 10 * np.log10(np.maximum(power, 1e-20))
+
+class LoudnessMeter:
+    """
+    BS.1770 integrated loudness, loudness range, maximum momentary and
+    short-term loudness and true peak of one output, fed (frames, channels)
+    float blocks in order. K-weighting and oversampling are FIR filters
+    applied with NumPy that carry their history from block to block; the
+    channels of a group are weighted equally.
+    """
+    def __init__(self, sample_rate, channels):
+        self.k_weighting = get_k_weighting_filter(sample_rate)
+        self.k_history = np.zeros((len(self.k_weighting) - 1, channels))
+        self.k_spectra = {}
+        self.phases = get_true_peak_phases()
+        self.peak_history = np.zeros((self.phases.shape[1] - 1, channels))
+        self.hop = max(1, round(sample_rate * LOUDNESS_HOP_SECONDS))
+        self.pending = np.zeros(0)
+        self.hop_powers = []
+        self.true_peak = 0.0
+
+    def add(self, frames):
+        extended = np.concatenate([self.k_history, frames])
+        size = 1 << (len(extended) - 1).bit_length()
+        if size not in self.k_spectra:
+            self.k_spectra[size] = np.fft.rfft(self.k_weighting, size)[:, None]
+        # Circular convolution is exact past the carried history
+        weighted = np.fft.irfft(
+            np.fft.rfft(extended, size, axis=0) * self.k_spectra[size], size, axis=0
+        )[len(self.k_history):len(extended)]
+        self.k_history = extended[len(extended) - len(self.k_history):]
+
+        power = np.concatenate([self.pending, np.sum(weighted * weighted, axis=1)])
+        usable = len(power) - len(power) % self.hop
+        if usable:
+            self.hop_powers.append(power[:usable].reshape(-1, self.hop).mean(axis=1))
+        self.pending = power[usable:]
+
+        extended = np.concatenate([self.peak_history, frames])
+        for channel in range(extended.shape[1]):
+            for phase in self.phases:
+                interpolated = np.convolve(extended[:, channel], phase[::-1], mode='valid')
+                if len(interpolated):
+                    self.true_peak = max(self.true_peak, float(np.max(np.abs(interpolated))))
+        self.peak_history = extended[len(extended) - len(self.peak_history):]
+
+    def get_stats(self):
+        """
+        Loudness in LUFS and range in LU; None where the audio is too short
+        or too quiet to be measured
+        """
+        powers = np.concatenate(self.hop_powers) if self.hop_powers else np.zeros(0)
+        stats = {
+            "true_peak": self.true_peak,
+            "integrated_lufs": None,
+            "loudness_range_lu": None,
+            "max_momentary_lufs": None,
+            "max_short_term_lufs": None,
+        }
+        if len(powers) >= MOMENTARY_HOPS:
+            blocks = np.convolve(powers, np.ones(MOMENTARY_HOPS) / MOMENTARY_HOPS, mode='valid')
+            max_momentary = float(power_to_lufs(blocks.max()))
+            if max_momentary > LOUDNESS_ABSOLUTE_GATE:
+                stats["max_momentary_lufs"] = max_momentary
+            blocks = blocks[power_to_lufs(blocks) > LOUDNESS_ABSOLUTE_GATE]
+            if len(blocks):
+                relative_gate = power_to_lufs(blocks.mean()) - 10
+                blocks = blocks[power_to_lufs(blocks) > relative_gate]
+                stats["integrated_lufs"] = float(power_to_lufs(blocks.mean()))
+        if len(powers) >= SHORT_TERM_HOPS:
+            windows = np.convolve(powers, np.ones(SHORT_TERM_HOPS) / SHORT_TERM_HOPS, mode='valid')
+            max_short_term = float(power_to_lufs(windows.max()))
+            if max_short_term > LOUDNESS_ABSOLUTE_GATE:
+                stats["max_short_term_lufs"] = max_short_term
+            windows = windows[power_to_lufs(windows) > LOUDNESS_ABSOLUTE_GATE]
+            if len(windows):
+                relative_gate = power_to_lufs(windows.mean()) - 20
+                loudness = power_to_lufs(windows[power_to_lufs(windows) > relative_gate])
+                stats["loudness_range_lu"] = float(
+                    np.percentile(loudness, 95) - np.percentile(loudness, 10)
+                )
+        return stats
+
+def to_dbfs(level):
+    return 20 * math.log10(level) if level > 0 else float("-inf")
+
+def pack_pcm_samples(values, out_bits):
+    """
+    Encode samples from unpack_pcm_samples as little-endian PCM of out_bits
+    and return them as a (frames, bytes_per_sample) uint8 array
+    """
+    if values.dtype.kind == 'f':
+        scale = float(1 << (out_bits - 1))
+        values = np.clip(np.rint(values * scale), -scale, scale - 1).astype(np.int64)
+        values = (values << (32 - out_bits)).astype(np.int32)
+    if out_bits == 8:
+        return ((values >> 24) + 128).astype(np.uint8).reshape(-1, 1)
+    if out_bits == 16:
+        return (values >> 16).astype('<i2').view(np.uint8).reshape(-1, 2)
+    if out_bits == 24:
+        return values.astype('<i4').view(np.uint8).reshape(-1, 4)[:, 1:]
+    return values.astype('<i4').view(np.uint8).reshape(-1, 4)
+
+class WAVChannelWriter:
+    """
+    Incrementally write a PCM or IEEE float WAV file block by block.
+    A JUNK chunk is reserved after the header and turned into a ds64 chunk on
+    close when the file outgrows RIFF, so any length can be streamed.
+    extra_chunks are raw (chunk_id, data) pairs written before the fmt chunk.
+    Files with several channels or a channel_mask are written as
+    WAVE_FORMAT_EXTENSIBLE and take interleaved frames. With hash_data the
+    header chunks and the sample data are hashed as they are written, see
+    get_data_digest and get_metadata_digest.
+    """
+    def __init__(
+        self,
+        output_file,
+        sample_rate,
+        bits_per_sample,
+        extra_chunks=(),
+        format_tag=WAVE_FORMAT_PCM,
+        channels=1,
+        channel_mask=None,
+        hash_data=False,
+    ):
+        self.output_file = output_file
+        self.block_align = channels * (bits_per_sample // 8)
+        self.data_size = 0
+        self.data_hash = hashlib.sha1() if hash_data else None
+        self.metadata_hash = hashlib.sha1() if hash_data else None
+        self.fact_offset = None
+        # Unlink first: an output hard linked as a duplicate by an earlier
+        # run shares its inode, which truncating would overwrite for both
+        if os.path.lexists(output_file):
+            os.remove(output_file)
+        self.file = open(output_file, 'wb')
+        try:
+            self.file.write(b'RIFF' + struct.pack('<I', 0) + b'WAVE')
+            self.file.write(b'JUNK' + struct.pack('<I', 28) + bytes(28))
+            extensible = channels > 1 or channel_mask is not None
+            fmt_data = struct.pack(
+                '<HHIIHH',
+                WAVE_FORMAT_EXTENSIBLE if extensible else format_tag,
+                channels,
+                sample_rate,
+                sample_rate * self.block_align,
+                self.block_align,
+                bits_per_sample,
+            )
+            if extensible:
+                # cbSize, valid bits, channel mask and the SubFormat GUID
+                fmt_data += struct.pack(
+                    '<HHIH', 22, bits_per_sample, channel_mask or 0, format_tag
+                ) + KSDATAFORMAT_SUBTYPE_SUFFIX
+            elif format_tag != WAVE_FORMAT_PCM:
+                fmt_data += struct.pack('<H', 0)
+            format_chunks = [(b'fmt ', fmt_data)]
+            if format_tag != WAVE_FORMAT_PCM:
+                # Non-PCM formats carry a fact chunk with the frame count
+                format_chunks.append((b'fact', bytes(4)))
+            for chunk_id, chunk_data in list(extra_chunks) + format_chunks:
+                self.file.write(chunk_id + struct.pack('<I', len(chunk_data)))
+                if chunk_id == b'fact':
+                    self.fact_offset = self.file.tell()
+                self.file.write(chunk_data)
+                if len(chunk_data) & 1:
+                    self.file.write(b'\x00')
+                if self.metadata_hash:
+                    self.metadata_hash.update(chunk_id + struct.pack('<I', len(chunk_data)) + chunk_data)
+            self.file.write(b'data')
+            self.data_size_offset = self.file.tell()
+            self.file.write(struct.pack('<I', 0))
+        except Exception:
+            self.file.close()
+            raise
+
+    def write(self, payload):
+        payload = np.ascontiguousarray(payload)
+        self.file.write(payload.data)
+        if self.data_hash:
+            self.data_hash.update(payload.data)
+        self.data_size += payload.nbytes
+
+    def get_data_digest(self):
+        """
+        Key that is equal for outputs holding bit-identical sample data
+        """
+        return (self.data_hash.hexdigest(), self.block_align, self.data_size)
+
+    def get_metadata_digest(self):
+        """
+        Hash of the chunks written before the data, such as fmt, bext and the
+        trimmed iXML, equal for outputs whose headers match
+        """
+        return self.metadata_hash.hexdigest()
+
+    def close(self):
+        if self.file.closed:
+            return
+        try:
+            if self.data_size & 1:
+                self.file.write(b'\x00')
+            riff_size = self.file.tell() - 8
+            if self.fact_offset is not None:
+                self.file.seek(self.fact_offset)
+                self.file.write(
+                    struct.pack('<I', min(self.data_size // self.block_align, MAX_RIFF_SIZE))
+                )
+            if riff_size > MAX_RIFF_SIZE:
+                self.file.seek(0)
+                self.file.write(b'RF64' + struct.pack('<I', MAX_RIFF_SIZE) + b'WAVE')
+                self.file.write(b'ds64' + struct.pack(
+                    '<IQQQI', 28, riff_size, self.data_size, self.data_size // self.block_align, 0
+                ))
+                self.file.seek(self.data_size_offset)
+                self.file.write(struct.pack('<I', MAX_RIFF_SIZE))
+            else:
+                self.file.seek(4)
+                self.file.write(struct.pack('<I', riff_size))
+                self.file.seek(self.data_size_offset)
+                self.file.write(struct.pack('<I', self.data_size))
+        finally:
+            self.file.close()
+
+def stream_channel_blocks(
+    stream,
+    data_size,
+    channels,
+    bytes_per_sample,
+    writers,
+    convert=None,
+    block_size=None,
+    progress_callback=None,
+    cancel_token=None,
+    level_meter=None,
+):
+    """
+    Read interleaved frames from stream in blocks and append every channel to
+    its writer. writers holds (channel_idx, writer) pairs indexing the
+    stream's channels; a list of indexes writes those channels interleaved.
+    convert, when given, maps a (samples, bytes_per_sample) view to output
+    samples. A data_size of None reads until the
+    stream ends. cancel_token is checked before every block, so a pause
+    holds the stream and a cancel raises SplitCancelled. level_meter, a
+    ChannelLevelMeter, measures each writer's samples as they go past.
+    Returns the number of bytes consumed.
+    """
+    block_align = channels * bytes_per_sample
+    block_frames = max(1, (block_size or DEFAULT_STREAM_BLOCK_SIZE) // block_align)
+    buffer = bytearray(block_frames * block_align)
+    view = memoryview(buffer)
+    remaining = None if data_size is None else data_size - data_size % block_align
+    processed = 0
+    filled = 0
+    while remaining is None or remaining > 0:
+        if cancel_token:
+            cancel_token.check()
+        limit = len(buffer) if remaining is None else min(len(buffer), remaining)
+        read_size = stream.readinto(view[filled:limit])
+        if not read_size:
+            break
+        filled += read_size
+        # Pipes may return partial frames; keep them for the next read
+        usable = filled - filled % block_align
+        if not usable:
+            continue
+        block = np.frombuffer(buffer, dtype=np.uint8, count=usable).reshape(
+            -1, channels, bytes_per_sample
+        )
+        for idx, (channel_idx, writer) in enumerate(writers):
+            samples = block[:, channel_idx, :]
+            if samples.ndim == 3:
+                # Channel groups come out frame by frame, interleaved
+                samples = samples.reshape(-1, bytes_per_sample)
+            if level_meter:
+                level_meter.add(idx, samples)
+            writer.write(convert(samples) if convert else samples)
+        del block
+        view[:filled - usable] = view[usable:filled]
+        filled -= usable
+        if remaining is not None:
+            remaining -= usable
+        processed += usable
+        if progress_callback:
+            progress_callback(usable)
+    if cancel_token:
+        # The stream may have ended because the cancel stopped its producer
+        cancel_token.check()
+    return processed
+
+def split_wav_native(
+    input_file,
+    channel_outputs,
+    override_bit_depth=None,
+    layout=None,
+    block_size=None,
+    progress_callback=None,
+    cancel_token=None,
+    levels=None,
+    digests=None,
+    loudness=False,
+    peak_cache=False,
+):
+    """
+    Split PCM/float WAV and RF64 channels without FFmpeg.
+    The interleaved data is streamed in blocks of block_size bytes and every
+    channel is taken as a strided view of the block, so peak memory does not
+    depend on the file length. Source metadata chunks are copied into each
+    output byte for byte. progress_callback receives the number of source
+    bytes processed after each block. When levels is a dict, the peak, RMS
+    and DC offset of every output are stored in it by output file, with
+    loudness and true peak too if loudness is set, and with peak_cache set a
+    waveform overview is streamed to a peak file next to every output;
+    digests, if a dict, likewise receives the hash of every output's sample
+    data.
+    """
+    writers = []
+    level_meter = None
+    try:
+        if layout is None:
+            layout = read_wav_layout(input_file)
+        bytes_per_sample = layout['bits_per_sample'] // 8
+        data_size = layout['data_size']
+        out_format, out_bits = get_output_format(
+            override_bit_depth, (layout['format_tag'], layout['bits_per_sample'])
+        )
+        chunks = read_passthrough_chunks(input_file, layout)
+
+        for channel, output_file in channel_outputs:
+            channel_indexes = get_output_channels(channel)
+            writers.append(
+                (
+                    channel if isinstance(channel, int) else channel_indexes,
+                    WAVChannelWriter(
+                        output_file,
+                        layout['sample_rate'],
+                        out_bits,
+                        get_output_chunks(chunks, channel_indexes),
+                        out_format,
+                        len(channel_indexes),
+                        get_output_channel_mask(channel),
+                        hash_data=digests is not None,
+                    ),
+                )
+            )
+
+        # Matching formats are a pure copy of each channel's bytes
+        if (layout['format_tag'], layout['bits_per_sample']) != (out_format, out_bits):
+            def convert(samples):
+                return pack_pcm_samples(
+                    unpack_pcm_samples(samples, layout['format_tag'], layout['bits_per_sample']),
+                    out_bits,
+                )
+        else:
+            convert = None
+
+        if levels is not None:
+            level_meter = ChannelLevelMeter(
+                layout['format_tag'],
+                layout['bits_per_sample'],
+                [len(get_output_channels(channel)) for channel, _ in channel_outputs],
+                layout['sample_rate'],
+                loudness,
+                [writer.output_file for _, writer in writers] if peak_cache else None,
+            )
+
+        with open(input_file, 'rb') as f:
+            f.seek(layout['data_offset'])
+            processed = stream_channel_blocks(
+                f,
+                data_size,
+                layout['channels'],
+                bytes_per_sample,
+                writers,
+                convert,
+                block_size,
+                progress_callback,
+                cancel_token,
+                level_meter,
+            )
+        if level_meter:
+            for idx, (_, writer) in enumerate(writers):
+                levels[writer.output_file] = level_meter.get_levels(idx)
+        if digests is not None:
+            for _, writer in writers:
+                digests[writer.output_file] = (
+                    writer.get_data_digest(),
+                    writer.get_metadata_digest(),
+                )
+
+        if progress_callback and data_size > processed:
+            progress_callback(data_size - processed)
+        for channel_idx, writer in writers:
+            writer.close()
+            channel_indexes = channel_idx if isinstance(channel_idx, list) else [channel_idx]
+            logger.debug(
+                f"Natively exported channel {format_channel_list(channel_indexes)} "
+                f"to '{writer.output_file}'"
+            )
+        return True
+
+    except SplitCancelled:
+        for _, writer in writers:
+            writer.close()
+        if level_meter:
+            level_meter.close()
+        raise
+    except Exception as e:
+        logger.error(f"Native split failed for '{input_file}': {e}")
+        logger.debug(traceback.format_exc())
+        for _, writer in writers:
+            writer.close()
+        if level_meter:
+            level_meter.close()
+        return False
+
+def get_audio_data_size(filepath):
+    """
+    Size of the audio payload of a file, used as the unit of byte progress
+    """
+    layout = read_wav_layout(filepath)
+    if layout and 'data_size' in layout:
+        return layout['data_size']
+    return os.path.getsize(filepath)
+
+def get_progress_totals(file_path):
+    """
+    Source bytes and seconds of audio a file adds to batch progress
+    """
+    try:
+        info = probe_audio_file(file_path, ffprobe_path)
+    except Exception as e:
+        logger.debug(f"Could not probe '{file_path}' for progress totals: {e}")
+        return get_audio_data_size(file_path), 0.0
+    return info["data_size"] or get_audio_data_size(file_path), info["duration"] or 0.0
+
+def format_duration(seconds):
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}"
+
+class ThroughputMeter:
+    """
+    Count the source bytes a split or batch has processed and work out the
+    percentage, MB/s, speed relative to realtime and time left
+    """
+    def __init__(self, total_bytes=0, total_seconds=0.0):
+        self.total_bytes = total_bytes
+        self.total_seconds = total_seconds
+        self.processed_bytes = 0
+        self.start_time = time.monotonic()
+
+    def add_total(self, num_bytes, seconds=0.0):
+        self.total_bytes += num_bytes
+        self.total_seconds += seconds
+
+    def add(self, num_bytes):
+        self.processed_bytes += num_bytes
+
+    def get_percent(self):
+        return min(int(self.processed_bytes / max(self.total_bytes, 1) * 100), 100)
+
+    def format_status(self):
+        parts = [f"{self.get_percent()}%"]
+        elapsed = time.monotonic() - self.start_time
+        if self.processed_bytes and elapsed > 0:
+            byte_rate = self.processed_bytes / elapsed
+            parts.append(f"{byte_rate / (1024 * 1024):.1f} MB/s")
+            if self.total_seconds and self.total_bytes:
+                # Audio seconds are estimated from the batch's average byte rate
+                audio_seconds = self.processed_bytes * self.total_seconds / self.total_bytes
+                parts.append(f"{audio_seconds / elapsed:.1f}x realtime")
+            remaining_bytes = max(self.total_bytes - self.processed_bytes, 0)
+            parts.append(f"ETA {format_duration(remaining_bytes / byte_rate)}")
+        return " | ".join(parts)
+
+def split_channels(
+    input_file,
+    channel_outputs,
+    override_bit_depth=None,
+    override_sample_rate=None,
+    progress_callback=None,
+    block_size=None,
+    verification="off",
+    debug_dumps=False,
+    timer=None,
+    cancel_token=None,
+    resampler="swr",
+    levels=None,
+    digests=None,
+    loudness=False,
+    peak_cache=False,
+):
+    """
+    Split channels with the native NumPy engine when the source allows it and
+    fall back to a single FFmpeg run for resampling or unsupported formats.
+    All channels of a source are resampled together by resampler. levels,
+    if a dict, receives the levels of every output by output file (with
+    loudness and true peak when loudness is set and a waveform overview when
+    peak_cache is set), and digests the hash of every output's sample data.
+    Outputs are re-read for metadata verification only as the verification
+    policy asks; with verification off and no debug dumps nothing but the
+    outputs is written or read back. Stage timings go to timer if given.
+    Raises SplitCancelled when cancel_token is cancelled mid-split.
+    """
+    timer = timer or StageTimer()
+    with timer.span("probe"):
+        layout = read_wav_layout(input_file)
+    if can_split_natively(layout, override_bit_depth, override_sample_rate):
+        logger.debug(f"Using native engine for '{input_file}'")
+        with timer.span("encode"):
+            success = split_wav_native(
+                input_file,
+                channel_outputs,
+                override_bit_depth,
+                layout,
+                block_size=block_size,
+                progress_callback=progress_callback,
+                cancel_token=cancel_token,
+                levels=levels,
+                digests=digests,
+                loudness=loudness,
+                peak_cache=peak_cache,
+            )
+    else:
+        logger.debug(f"Using FFmpeg for '{input_file}'")
+        success = run_ffmpeg_multi_output(
+            input_file,
+            channel_outputs,
+            override_bit_depth,
+            override_sample_rate,
+            block_size,
+            debug_dumps,
+            timer=timer,
+            progress_callback=progress_callback,
+            cancel_token=cancel_token,
+            resampler=resampler,
+            levels=levels,
+            digests=digests,
+            loudness=loudness,
+            peak_cache=peak_cache,
+        )
+
+    if success and verification != "off":
+        verified_outputs = [
+            output_file
+            for _, output_file in channel_outputs
+            if should_verify_output(output_file, verification)
+        ]
+        if verified_outputs:
+            with timer.span("metadata_read"):
+                source_metadata = WAVMetadataReader(input_file).metadata
+            debug_dir = None
+            if debug_dumps:
+                with timer.span("debug_write"):
+                    debug_dir = get_debug_metadata_dir(verified_outputs[0])
+            with timer.span("verify"):
+                for output_file in verified_outputs:
+                    verify_output_metadata(source_metadata, output_file, debug_dir)
+    return success
+
+def get_debug_metadata_dir(output_file):
+    debug_dir = os.path.join(os.path.dirname(output_file), "debug_metadata")
+    os.makedirs(debug_dir, exist_ok=True)
+    return debug_dir
+
+def iter_wav_files(input_dir, exclude_dirs=()):
+    """
+    Yield the path of every .wav file under input_dir as it is found.
+    Subfolders are walked with os.scandir one directory at a time, so the
+    first files can be split while slow network shares are still listing.
+    """
+    excluded = {os.path.normcase(os.path.abspath(path)) for path in exclude_dirs}
+    pending_dirs = [input_dir]
+    while pending_dirs:
+        current_dir = pending_dirs.pop()
+        subdirs = []
+        try:
+            with os.scandir(current_dir) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir():
+                            if os.path.normcase(os.path.abspath(entry.path)) not in excluded:
+                                subdirs.append(entry.path)
+                        elif entry.is_file() and entry.name.lower().endswith(".wav"):
+                            yield entry.path
+                    except OSError as e:
+                        logger.warning(f"Skipping '{entry.path}': {e}")
+        except OSError as e:
+            logger.warning(f"Could not list directory '{current_dir}': {e}")
+            continue
+        # Walk subfolders in name order (popped from the end of the stack)
+        pending_dirs.extend(sorted(subdirs, reverse=True))
+
+def get_mirrored_output_dir(input_file, input_dir, output_dir):
+    """
+    Map a file found under input_dir to the matching subfolder of output_dir.
+    """
+    relative_dir = os.path.relpath(os.path.dirname(input_file), input_dir)
+    if relative_dir == os.curdir:
+        return output_dir
+    return os.path.join(output_dir, relative_dir)
+
+JOURNAL_FILENAME = ".zq_split_journal.sqlite3"
+SOURCE_HASH_SPAN = 1024 * 1024
+
+def get_journal_path(output_dir):
+    return os.path.join(output_dir, JOURNAL_FILENAME)
+
+def get_source_fingerprint(input_file):
+    """
+    Size, mtime and a SHA-1 of the first and last MiB of a source file.
+    Hashing only the ends keeps re-runs over multi-gigabyte files cheap.
+    """
+    stat = os.stat(input_file)
+    digest = hashlib.sha1()
+    with open(input_file, "rb") as f:
+        digest.update(f.read(SOURCE_HASH_SPAN))
+        if stat.st_size > 2 * SOURCE_HASH_SPAN:
+            f.seek(-SOURCE_HASH_SPAN, os.SEEK_END)
+            digest.update(f.read(SOURCE_HASH_SPAN))
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha1": digest.hexdigest()}
+
+def get_output_fingerprint(source_fingerprint, channel_idx, options):
+    settings = {
+        "source": source_fingerprint,
+        "channel": channel_idx,
+        # Without an override the outputs match the source sample format
+        "bit_depth": options["override_bit_depth"] or "source",
+        "override_sample_rate": options["override_sample_rate"],
+        "naming_scheme": options["naming_scheme"],
+        "custom_names": options["custom_names"],
+    }
+    if options["override_sample_rate"]:
+        settings["resampler"] = options["resampler"]
+    if options["silence_threshold_db"] is not None:
+        settings["silence"] = [options["silence_threshold_db"], options["silent_action"]]
+    if options["duplicate_action"]:
+        settings["duplicates"] = options["duplicate_action"]
+    if options["bext_loudness"]:
+        settings["bext_loudness"] = True
+    if options["analysis"]:
+        # Outputs made without analysis have no row to report on resume
+        settings["analysis"] = True
+    if options["peak_files"]:
+        settings["peak_files"] = True
+    return hashlib.sha1(json.dumps(settings, sort_keys=True).encode()).hexdigest()
+
+class SplitJournal:
+    """
+    SQLite record of the outputs a batch has finished, stored in the output
+    folder. Each output keeps the fingerprint of the source and settings it
+    was made from, so a re-run only redoes missing, stale or failed outputs,
+    and its analysis row, so skipped outputs can still be reported.
+    """
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.root = os.path.dirname(os.path.abspath(db_path))
+        self.lock = threading.Lock()
+        self.connection = None
+
+    def connect(self):
+        if self.connection is not None and not os.path.exists(self.db_path):
+            # The output folder was deleted under a cached connection, which
+            # would keep writing to the unlinked file; start a new journal
+            self.close()
+        if self.connection is None:
+            self.connection = sqlite3.connect(
+                self.db_path, timeout=30, check_same_thread=False
+            )
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS outputs ("
+                "output_path TEXT PRIMARY KEY, source_path TEXT, fingerprint TEXT, "
+                "size INTEGER, mtime_ns INTEGER, analysis TEXT)"
+            )
+            columns = [row[1] for row in self.connection.execute("PRAGMA table_info(outputs)")]
+            if "analysis" not in columns:
+                # Journals from before the analysis column
+                self.connection.execute("ALTER TABLE outputs ADD COLUMN analysis TEXT")
+            self.connection.commit()
+        return self.connection
+
+    def close(self):
+        if self.connection is not None:
+            try:
+                self.connection.close()
+            except sqlite3.Error as e:
+                logger.debug(f"Error closing split journal '{self.db_path}': {e}")
+            self.connection = None
+
+    def get_key(self, output_file):
+        # Relative keys keep the journal valid if the output folder is moved
+        return os.path.relpath(os.path.abspath(output_file), self.root)
+
+    def is_current(self, output_file, fingerprint):
+        try:
+            with self.lock:
+                row = self.connect().execute(
+                    "SELECT fingerprint, size, mtime_ns FROM outputs WHERE output_path = ?",
+                    (self.get_key(output_file),),
+                ).fetchone()
+        except Exception as e:
+            logger.error(f"Error reading split journal: {e}")
+            logger.debug(traceback.format_exc())
+            return False
+        if row and row[1] is None:
+            # A silent or duplicate output that was deliberately not kept
+            return row[0] == fingerprint
+        try:
+            stat = os.stat(output_file)
+        except OSError:
+            return False
+        return row == (fingerprint, stat.st_size, stat.st_mtime_ns)
+
+    def forget(self, output_files):
+        try:
+            with self.lock:
+                connection = self.connect()
+                connection.executemany(
+                    "DELETE FROM outputs WHERE output_path = ?",
+                    [(self.get_key(output_file),) for output_file in output_files],
+                )
+                connection.commit()
+        except Exception as e:
+            logger.error(f"Error updating split journal: {e}")
+            logger.debug(traceback.format_exc())
+
+    def get_analysis(self, output_files):
+        """
+        Stored analysis rows of the given outputs, in order, skipping
+        outputs that have none
+        """
+        rows = []
+        try:
+            with self.lock:
+                connection = self.connect()
+                for output_file in output_files:
+                    row = connection.execute(
+                        "SELECT analysis FROM outputs WHERE output_path = ?",
+                        (self.get_key(output_file),),
+                    ).fetchone()
+                    if row and row[0]:
+                        rows.append(json.loads(row[0]))
+        except Exception as e:
+            logger.error(f"Error reading split journal: {e}")
+            logger.debug(traceback.format_exc())
+        return rows
+
+    def record(self, output_file, source_path, fingerprint, set_aside=False, analysis=None):
+        """
+        Record a finished output and its analysis row, if any. Outputs set
+        aside as silent or duplicate are recorded without a size, so they
+        stay done.
+        """
+        try:
+            stat = None if set_aside else os.stat(output_file)
+            with self.lock:
+                connection = self.connect()
+                connection.execute(
+                    "INSERT OR REPLACE INTO outputs "
+                    "(output_path, source_path, fingerprint, size, mtime_ns, analysis) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (
+                        self.get_key(output_file),
+                        os.path.abspath(source_path),
+                        fingerprint,
+                        stat.st_size if stat else None,
+                        stat.st_mtime_ns if stat else None,
+                        json.dumps(analysis) if analysis else None,
+                    ),
+                )
+                connection.commit()
+        except Exception as e:
+            logger.error(f"Error writing split journal: {e}")
+            logger.debug(traceback.format_exc())
+
+split_journals = {}
+
+def get_split_journal(journal_path):
+    # One connection per journal per process; batch workers each open their own,
+    # and a journal whose file was deleted reconnects on its next use
+    if journal_path not in split_journals:
+        split_journals[journal_path] = SplitJournal(journal_path)
+    return split_journals[journal_path]
+
+# Queue batch worker processes report (input_file, num_bytes) progress on,
+# and the CancelToken of their batch
+batch_progress_queue = None
+batch_cancel_token = None
+
+def init_batch_worker(progress_queue, cancel_token=None):
+    global batch_progress_queue, batch_cancel_token
+    batch_progress_queue = progress_queue
+    batch_cancel_token = cancel_token
+    # Ctrl+C reaches the whole process group; the parent decides what to cancel
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+def split_file_task(input_file, output_dir, options, progress_callback=None, cancel_token=None):
+    """
+    Split the selected channels of one source file with the given split options.
+    Runs inside a batch worker process, so everything it needs is passed in
+    and the outcome is returned as a plain dict, including the stage timing
+    spans and wall time of the file.
+    """
+    if progress_callback is None and batch_progress_queue is not None:
+        def progress_callback(num_bytes):
+            batch_progress_queue.put((input_file, num_bytes))
+    cancel_token = cancel_token or batch_cancel_token
+    timer = StageTimer()
+    start = time.perf_counter()
+    result = split_file_stages(
+        input_file, output_dir, options, timer, progress_callback, cancel_token
+    )
+    result["wall_time"] = time.perf_counter() - start
+    result["spans"] = timer.spans
+    return result
+
+def split_file_stages(
+    input_file, output_dir, options, timer, progress_callback=None, cancel_token=None
+):
+    wav_file = os.path.basename(input_file)
+    result = {
+        "file": input_file,
+        "success": False,
+        "cancelled": False,
+        "error": None,
+        "outputs": [],
+        "skipped": [],
+        "silent": [],
+        "duplicates": [],
+        "analysis": [],
+        "bytes": 0,
+    }
+    logger.info(f"Processing file: {input_file}")
+    try:
+        with timer.span("probe"):
+            result["bytes"] = get_audio_data_size(input_file)
+
+            total_channels = probe_audio_file(input_file, ffprobe_path)["channels"]
+        logger.debug(f"Total channels in '{wav_file}': {total_channels}")
+    except Exception as e:
+        logger.error(f"Error determining total channels for '{wav_file}': {e}")
+        result["error"] = f"Error determining total channels for '{wav_file}': {e}"
+        return result
+
+    selected_channels = options["selected_channels"]
+    if options["channel_groups"]:
+        selected_channels = get_group_outputs(options["channel_groups"], total_channels)
+    elif selected_channels is None:
+        selected_channels = range(total_channels)
+    else:
+        selected_channels = [idx for idx in selected_channels if idx < total_channels]
+
+    # Split every channel from a single decode of the source
+    base_name, _ = os.path.splitext(wav_file)
+    try:
+        with timer.span("directory"):
+            os.makedirs(output_dir, exist_ok=True)
+    except OSError as e:
+        logger.error(f"Error creating output directory '{output_dir}': {e}")
+        result["error"] = f"Error creating output directory '{output_dir}': {e}"
+        return result
+    channel_outputs = [
+        (
+            channel_idx,
+            os.path.join(
+                output_dir,
+                get_output_filename(
+                    base_name, channel_idx, options["naming_scheme"], options["custom_names"]
+                ),
+            ),
+        )
+        for channel_idx in selected_channels
+    ]
+
+    journal = None
+    if options["journal_path"]:
+        try:
+            with timer.span("journal"):
+                journal = get_split_journal(options["journal_path"])
+                source_fingerprint = get_source_fingerprint(input_file)
+                fingerprints = {
+                    output_file: get_output_fingerprint(source_fingerprint, channel_idx, options)
+                    for channel_idx, output_file in channel_outputs
+                }
+                if options["resume"]:
+                    result["skipped"] = [
+                        output_file
+                        for _, output_file in channel_outputs
+                        if journal.is_current(output_file, fingerprints[output_file])
+                    ]
+        except Exception as e:
+            logger.warning(f"Split journal unavailable for '{wav_file}', splitting everything: {e}")
+            logger.debug(traceback.format_exc())
+            journal = None
+            result["skipped"] = []
+    if result["skipped"]:
+        logger.info(f"Skipping {len(result['skipped'])} up-to-date output(s) of '{wav_file}'")
+        if options["analysis"]:
+            with timer.span("journal"):
+                result["analysis"] = journal.get_analysis(result["skipped"])
+        channel_outputs = [
+            (channel_idx, output_file)
+            for channel_idx, output_file in channel_outputs
+            if output_file not in result["skipped"]
+        ]
+        if not channel_outputs:
+            if progress_callback:
+                progress_callback(result["bytes"])
+            result["success"] = True
+            return result
+    if journal:
+        # Outputs about to be rewritten are not trustworthy until they finish
+        with timer.span("journal"):
+            journal.forget([output_file for _, output_file in channel_outputs])
+
+    # Levels are measured on the blocks being written when silent outputs
+    # are to be set aside or the outputs analysed
+    loudness = bool(options["analysis"] or options["bext_loudness"])
+    levels = (
+        {}
+        if options["silence_threshold_db"] is not None or loudness or options["peak_files"]
+        else None
+    )
+    # The same goes for the hashes that find bit-identical outputs
+    digests = {} if options["duplicate_action"] else None
+    try:
+        success = split_channels(
+            input_file,
+            channel_outputs,
+            options["override_bit_depth"],
+            options["override_sample_rate"],
+            progress_callback=progress_callback,
+            block_size=options["block_size"],
+            verification=options["verification"],
+            debug_dumps=options["debug_dumps"],
+            timer=timer,
+            cancel_token=cancel_token,
+            resampler=options["resampler"],
+            levels=levels,
+            digests=digests,
+            loudness=loudness,
+            peak_cache=options["peak_files"],
+        )
+
+        if success:
+            if options["silence_threshold_db"] is not None:
+                with timer.span("silence"):
+                    result["silent"] = set_aside_silent_outputs(
+                        levels, options["silence_threshold_db"], options["silent_action"]
+                    )
+            silent_outputs = {silent["output"] for silent in result["silent"]}
+            if digests:
+                with timer.span("duplicates"):
+                    result["duplicates"] = set_aside_duplicate_outputs(
+                        {
+                            output_file: digest
+                            for output_file, digest in digests.items()
+                            if output_file not in silent_outputs
+                        },
+                        options["duplicate_action"],
+                        os.path.join(output_dir, base_name + DUPLICATES_MANIFEST_SUFFIX),
+                        input_file,
+                    )
+            # Outputs that no longer exist on disk
+            set_aside = silent_outputs | {
+                duplicate["output"] for duplicate in result["duplicates"] if not duplicate["linked"]
+            }
+            analysis_rows = {}
+            if options["analysis"]:
+                statuses = {}
+                for silent in result["silent"]:
+                    statuses[silent["output"]] = (
+                        ("quarantined", silent["moved_to"]) if silent["moved_to"] else ("silent", None)
+                    )
+                for duplicate in result["duplicates"]:
+                    statuses[duplicate["output"]] = (
+                        "linked" if duplicate["linked"] else "duplicate", None
+                    )
+                analysis_rows = {
+                    output_file: get_analysis_row(
+                        output_file,
+                        input_file,
+                        levels[output_file],
+                        *statuses.get(output_file, ("written", None)),
+                    )
+                    for _, output_file in channel_outputs
+                }
+                result["analysis"].extend(analysis_rows.values())
+            if options["bext_loudness"]:
+                with timer.span("bext"):
+                    for _, output_file in channel_outputs:
+                        if output_file not in set_aside:
+                            write_bext_loudness(output_file, levels[output_file])
+            if options["peak_files"]:
+                # Peak files are streamed during the split; drop those of set-aside outputs
+                for output_file in set_aside:
+                    peak_path = levels[output_file].pop("peak_file")
+                    try:
+                        os.remove(peak_path)
+                    except OSError as e:
+                        logger.error(f"Failed to remove peak file '{peak_path}': {e}")
+            for _, output_file in channel_outputs:
+                if output_file not in set_aside:
+                    logger.info(f"Exported with metadata: {output_file}")
+                if journal:
+                    with timer.span("journal"):
+                        journal.record(
+                            output_file,
+                            input_file,
+                            fingerprints[output_file],
+                            set_aside=output_file in set_aside,
+                            analysis=analysis_rows.get(output_file),
+                        )
+        else:
+            raise Exception("Failed to export with metadata")
+
+    except SplitCancelled:
+        logger.info(f"Cancelled while splitting '{wav_file}'")
+        partial_outputs = [output_file for _, output_file in channel_outputs]
+        if options["peak_files"]:
+            partial_outputs += [output_file + PEAK_FILE_SUFFIX for output_file in partial_outputs]
+        remove_partial_outputs(partial_outputs)
+        result["cancelled"] = True
+        result["error"] = f"Cancelled while splitting '{wav_file}'"
+        return result
+    except Exception as e:
+        logger.error(f"Error processing channels of '{wav_file}': {e}")
+        logger.debug(traceback.format_exc())
+        result["error"] = f"Error processing channels of '{wav_file}': {e}"
+        return result
+
+    result["success"] = True
+    result["outputs"] = [
+        output_file for _, output_file in channel_outputs if output_file not in set_aside
+    ]
+    return result
+
+def round_level(value, digits=2):
+    if value is None or not math.isfinite(value):
+        return None
+    # Adding zero folds a rounded -0.0 into 0.0
+    return round(value, digits) + 0.0
+
+def get_analysis_row(output_file, input_file, levels, status="written", moved_to=None):
+    """
+    Sidecar row with the ANALYSIS_FIELDS of one output; levels that cannot
+    be measured, such as the loudness of digital silence, are None
+    """
+    return {
+        "output": output_file,
+        "status": status,
+        "moved_to": moved_to,
+        "source": input_file,
+        "channels": levels["channels"],
+        "peak_dbfs": round_level(to_dbfs(levels["peak"])),
+        "true_peak_dbtp": round_level(to_dbfs(levels["true_peak"])),
+        "rms_dbfs": round_level(to_dbfs(levels["rms"])),
+        "dc_offset": round_level(levels["dc_offset"], 6),
+        "integrated_lufs": round_level(levels.get("integrated_lufs")),
+        "loudness_range_lu": round_level(levels.get("loudness_range_lu")),
+        "max_momentary_lufs": round_level(levels.get("max_momentary_lufs")),
+        "max_short_term_lufs": round_level(levels.get("max_short_term_lufs")),
+    }
+
+def get_analysis_path(output_dir, analysis_format):
+    return os.path.join(output_dir, f"{ANALYSIS_FILENAME}.{analysis_format}")
+
+def read_analysis_sidecar(sidecar_path, analysis_format):
+    """
+    Rows of an existing analysis sidecar, or an empty list
+    """
+    if not os.path.exists(sidecar_path):
+        return []
+    try:
+        with open(sidecar_path, "r", newline="") as f:
+            if analysis_format == "csv":
+                return list(csv.DictReader(f))
+            return [json.loads(line) for line in f if line.strip()]
+    except Exception as e:
+        logger.warning(f"Could not read channel analysis '{sidecar_path}', rewriting it: {e}")
+        logger.debug(traceback.format_exc())
+        return []
+
+def write_analysis_sidecar(sidecar_path, results, analysis_format):
+    """
+    Merge the analysis rows of every split_file_task result into one JSON
+    Lines or CSV file. Rows already in the file are kept unless a result has a
+    newer row for the same output, so a partial re-split or a batch of
+    other sources never drops earlier rows.
+    """
+    rows = [row for result in results for row in result.get("analysis", [])]
+    if not rows:
+        return
+    new_outputs = {row["output"] for row in rows}
+    rows = [
+        row for row in read_analysis_sidecar(sidecar_path, analysis_format)
+        if row.get("output") not in new_outputs
+    ] + rows
+    try:
+        temp_path = sidecar_path + ".tmp"
+        if analysis_format == "csv":
+            with open(temp_path, "w", newline="") as f:
+                writer = csv.DictWriter(f, fieldnames=ANALYSIS_FIELDS, extrasaction="ignore")
+                writer.writeheader()
+                writer.writerows(rows)
+        else:
+            with open(temp_path, "w") as f:
+                for row in rows:
+                    f.write(json.dumps(row) + "\n")
+        os.replace(temp_path, sidecar_path)
+    except Exception as e:
+        logger.error(f"Error writing channel analysis to '{sidecar_path}': {e}")
+        logger.debug(traceback.format_exc())
+
+def append_analysis_rows(sidecar_path, rows, analysis_format):
+    """
+    Append analysis rows to a sidecar without reading it, as watch mode
+    does after every file. An output split again gets a second row; the
+    last row of an output is the current one.
+    """
+    if not rows:
+        return
+    try:
+        if analysis_format == "csv":
+            new_file = not os.path.exists(sidecar_path) or os.path.getsize(sidecar_path) == 0
+            with open(sidecar_path, "a", newline="") as f:
+                writer = csv.DictWriter(f, fieldnames=ANALYSIS_FIELDS, extrasaction="ignore")
+                if new_file:
+                    writer.writeheader()
+                writer.writerows(rows)
+        else:
+            with open(sidecar_path, "a") as f:
+                for row in rows:
+                    f.write(json.dumps(row) + "\n")
+    except Exception as e:
+        logger.error(f"Error writing channel analysis to '{sidecar_path}': {e}")
+        logger.debug(traceback.format_exc())
+
+# Offsets in a bext chunk of the version field and the five BWF v2 loudness fields
+BEXT_VERSION_OFFSET = 346
+BEXT_LOUDNESS_OFFSET = 412
+# Value of a loudness field that holds no measurement
+BEXT_LOUDNESS_UNSET = 0x7FFF
+
+def write_bext_loudness(output_file, levels):
+    """
+    Fill the loudness fields of the bext chunk an output copied from its
+    source, in hundredths of LUFS, LU and dBTP, and raise its version to 2.
+    Outputs without a bext chunk are left alone. Returns whether the fields
+    were written.
+    """
+    layout = read_wav_layout(output_file)
+    bext_chunks = [
+        (offset, size) for chunk_id, offset, size in (layout or {}).get('chunks', [])
+        if chunk_id == b'bext'
+    ]
+    if not bext_chunks or bext_chunks[0][1] < BEXT_LOUDNESS_OFFSET + 10:
+        return False
+    offset = bext_chunks[0][0]
+
+    def field(value):
+        value = round_level(value)
+        if value is None:
+            return BEXT_LOUDNESS_UNSET
+        return max(-0x8000, min(0x7FFE, int(round(value * 100))))
+
+    with open(output_file, 'r+b') as f:
+        f.seek(offset + BEXT_VERSION_OFFSET)
+        version = struct.unpack('<H', f.read(2))[0]
+        if version < 2:
+            f.seek(offset + BEXT_VERSION_OFFSET)
+            f.write(struct.pack('<H', 2))
+        f.seek(offset + BEXT_LOUDNESS_OFFSET)
+        f.write(struct.pack(
+            '<5h',
+            field(levels.get("integrated_lufs")),
+            field(levels.get("loudness_range_lu")),
+            field(to_dbfs(levels["true_peak"])),
+            field(levels.get("max_momentary_lufs")),
+            field(levels.get("max_short_term_lufs")),
+        ))
+    return True
+
+def set_aside_duplicate_outputs(digests, action, manifest_path, input_file):
+    """
+    Replace every output whose sample data is bit-identical to an earlier
+    output in digests with a hard link to it, or remove it and list it in
+    the JSON manifest at manifest_path when action is manifest or the file
+    system cannot link. digests maps outputs to (data digest, metadata
+    digest) pairs. A hard link shares every chunk of its original, so with
+    link a duplicate whose metadata chunks differ, such as its own iXML
+    track, is listed in the manifest too. Returns a dict per duplicate with
+    the output, its original and whether it was linked.
+    """
+    if action not in DUPLICATE_ACTIONS:
+        raise ValueError(f"Unknown duplicate_action: {action}")
+    originals = {}
+    duplicates = []
+    for output_file, (data_digest, metadata_digest) in digests.items():
+        original, original_metadata = originals.setdefault(
+            data_digest, (output_file, metadata_digest)
+        )
+        if original == output_file:
+            continue
+        os.remove(output_file)
+        linked = False
+        if action == "link":
+            if metadata_digest != original_metadata:
+                logger.info(
+                    f"Metadata of duplicate output '{output_file}' differs from its original, "
+                    f"listing it in the manifest"
+                )
+            else:
+                try:
+                    os.link(original, output_file)
+                    linked = True
+                    logger.info(f"Linked duplicate output {output_file} to {original}")
+                except OSError as e:
+                    logger.warning(f"Could not hard link '{output_file}', listing it in the manifest: {e}")
+        if not linked:
+            logger.info(f"Skipped duplicate output {output_file} of {original}")
+        duplicates.append({"output": output_file, "original": original, "linked": linked})
+
+    manifest = {
+        os.path.basename(duplicate["output"]): os.path.basename(duplicate["original"])
+        for duplicate in duplicates
+        if not duplicate["linked"]
+    }
+    if manifest:
+        with open(manifest_path, "w") as f:
+            json.dump({"source": input_file, "duplicates": manifest}, f, indent=2)
+    return duplicates
+
+def set_aside_silent_outputs(levels, threshold_db, action="skip"):
+    """
+    Remove the outputs in levels whose peak stays below threshold_db dBFS,
+    or move them into a SILENT_DIRNAME folder next to them when action is
+    quarantine. Returns a dict per silent output with the output file, where
+    it was moved to (None when removed) and its peak and RMS in dBFS.
+    """
+    if action not in SILENT_ACTIONS:
+        raise ValueError(f"Unknown silent_action: {action}")
+    silent = []
+    for output_file, output_levels in levels.items():
+        peak_db = to_dbfs(output_levels["peak"])
+        if peak_db >= threshold_db:
+            continue
+        moved_to = None
+        if action == "quarantine":
+            quarantine_dir = os.path.join(os.path.dirname(output_file), SILENT_DIRNAME)
+            os.makedirs(quarantine_dir, exist_ok=True)
+            moved_to = os.path.join(quarantine_dir, os.path.basename(output_file))
+            os.replace(output_file, moved_to)
+            logger.info(f"Quarantined silent output ({peak_db:.1f} dBFS peak): {moved_to}")
+        else:
+            os.remove(output_file)
+            logger.info(f"Skipped silent output ({peak_db:.1f} dBFS peak): {output_file}")
+        silent.append({
+            "output": output_file,
+            "moved_to": moved_to,
+            "peak_db": peak_db,
+            "rms_db": to_dbfs(output_levels["rms"]),
+        })
+    return silent
+
+# Finished files remembered to drop their late progress reports when results are not kept
+FINISHED_FILES_KEPT = 1024
+
+def run_batch_tasks(
+    task_args, workers, on_result, progress_callback=None, cancel_token=None, keep_results=True
+):
+    """
+    Run split_file_task for every (input_file, output_dir, options) tuple in task_args.
+    task_args may be a generator: each file is handed to a worker as soon as
+    it is yielded, so splitting starts while discovery is still running.
+    A None item submits nothing but lets finished files be reported, so an
+    endless generator such as iter_watch_tasks can idle without holding
+    results back. With more than one worker the files are spread over a
+    process pool; on_result(idx, result) is called as each file finishes,
+    and the returned list keeps the order in which the tasks were yielded.
+    cancel_token is checked between tasks: a pause holds back new files and
+    a cancel stops the batch, cancels queued files and makes running ones
+    stop, kill their FFmpeg process and remove their partial outputs.
+    With keep_results off, results are only handed to on_result and an
+    empty list is returned, so an endless watch keeps no per-file state.
+    """
+    results = []
+    submitted = 0
+    if workers <= 1:
+        for args in task_args:
+            if cancel_token:
+                try:
+                    cancel_token.check()
+                except SplitCancelled:
+                    break
+            if args is None:
+                continue
+            result = split_file_task(
+                *args, progress_callback=progress_callback, cancel_token=cancel_token
+            )
+            if keep_results:
+                results.append(result)
+            on_result(submitted, result)
+            submitted += 1
+        return results
+
+    def collect(future):
+        idx, args = pending.pop(future)
+        try:
+            result = future.result()
+        except Exception as e:
+            cancelled = isinstance(e, concurrent.futures.CancelledError)
+            if not cancelled:
+                logger.error(f"Batch worker failed on '{args[0]}': {e}")
+                logger.debug(traceback.format_exc())
+            result = {
+                "file": args[0],
+                "success": False,
+                "cancelled": cancelled,
+                "error": (
+                    f"Cancelled before splitting '{os.path.basename(args[0])}'"
+                    if cancelled
+                    else f"Error processing '{os.path.basename(args[0])}': {e}"
+                ),
+                "outputs": [],
+                "skipped": [],
+                "silent": [],
+                "duplicates": [],
+                "analysis": [],
+                "bytes": 0,
+                "wall_time": 0.0,
+                "spans": [],
+            }
+        if progress_callback:
+            # Top up whatever live progress the worker did not get to report
+            remaining = result["bytes"] - reported_bytes.pop(args[0], 0)
+            if remaining > 0:
+                progress_callback(remaining)
+        finished_files[args[0]] = True
+        if keep_results:
+            results[idx] = result
+        elif len(finished_files) > FINISHED_FILES_KEPT:
+            del finished_files[next(iter(finished_files))]
+        on_result(idx, result)
+
+    def drain_progress():
+        while True:
+            try:
+                input_file, num_bytes = progress_queue.get_nowait()
+            except queue.Empty:
+                return
+            if input_file in finished_files:
+                # Late report from a file that has already been topped up
+                continue
+            reported_bytes[input_file] = reported_bytes.get(input_file, 0) + num_bytes
+            if progress_callback:
+                progress_callback(num_bytes)
+
+    # Spawned workers re-import the launching script as __mp_main__, so the GUI
+    # and CLI keep their start-up code under their __main__ guard
+    mp_context = multiprocessing.get_context("spawn")
+    progress_queue = mp_context.Queue()
+    reported_bytes = {}
+    # Insertion ordered, so the oldest entries can be dropped
+    finished_files = {}
+    pending = {}
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=mp_context,
+        initializer=init_batch_worker,
+        initargs=(progress_queue, cancel_token),
+    ) as executor:
+        for args in task_args:
+            # Hold back new files while paused, still reporting finished ones
+            while cancel_token and cancel_token.is_paused():
+                drain_progress()
+                for future in [future for future in pending if future.done()]:
+                    collect(future)
+                cancel_token.running.wait(0.25)
+            if cancel_token and cancel_token.is_cancelled():
+                break
+            if args is not None:
+                if keep_results:
+                    results.append(None)
+                finished_files.pop(args[0], None)
+                pending[executor.submit(split_file_task, *args)] = (submitted, args)
+                submitted += 1
+            # Report files that finished while discovery was still walking
+            drain_progress()
+            for future in [future for future in pending if future.done()]:
+                collect(future)
+        queued_cancelled = False
+        while pending:
+            if cancel_token and cancel_token.is_cancelled() and not queued_cancelled:
+                # Drop queued files; running ones stop at their next block
+                executor.shutdown(wait=False, cancel_futures=True)
+                queued_cancelled = True
+            concurrent.futures.wait(
+                pending, timeout=0.25, return_when=concurrent.futures.FIRST_COMPLETED
+            )
+            drain_progress()
+            # Futures cancelled by the shutdown never wake wait(), so poll done()
+            for future in [future for future in pending if future.done()]:
+                collect(future)
+    return results
+
+TIMINGS_FILENAME = ".zq_split_timings.jsonl"
+
+def get_timings_path(output_dir):
+    return os.path.join(output_dir, TIMINGS_FILENAME)
+
+def write_timing_spans(timings_path, result):
+    """
+    Append the stage spans of one split_file_task result as JSON lines.
+    """
+    try:
+        with open(timings_path, "a") as f:
+            for span in result["spans"]:
+                f.write(json.dumps({"file": result["file"], **span}) + "\n")
+            f.write(json.dumps({
+                "file": result["file"],
+                "stage": "total",
+                "seconds": result["wall_time"],
+                "bytes": result["bytes"],
+                "success": result["success"],
+            }) + "\n")
+    except Exception as e:
+        logger.error(f"Error writing timings to '{timings_path}': {e}")
+        logger.debug(traceback.format_exc())
+
+def build_timing_report(results, slowest=5):
+    """
+    Sum the stage spans of a batch and work out per-file percentiles.
+    """
+    stage_totals = {}
+    for result in results:
+        for span in result.get("spans", []):
+            stage_totals[span["stage"]] = stage_totals.get(span["stage"], 0.0) + span["seconds"]
+    wall_times = [result.get("wall_time", 0.0) for result in results]
+    ranked = sorted(results, key=lambda result: result.get("wall_time", 0.0), reverse=True)
+    return {
+        "files": len(results),
+        "total_seconds": sum(wall_times),
+        "stage_totals": dict(sorted(stage_totals.items(), key=lambda item: item[1], reverse=True)),
+        "p50_seconds": float(np.percentile(wall_times, 50)) if wall_times else 0.0,
+        "p95_seconds": float(np.percentile(wall_times, 95)) if wall_times else 0.0,
+        "slowest": [(result["file"], result.get("wall_time", 0.0)) for result in ranked[:slowest]],
+    }
+
+def format_timing_report(report):
+    lines = [
+        f"{report['files']} file(s), {report['total_seconds']:.1f}s of split time",
+        f"Per file: p50 {report['p50_seconds']:.2f}s, p95 {report['p95_seconds']:.2f}s",
+        "Time by stage:",
+    ]
+    for stage, seconds in report["stage_totals"].items():
+        share = seconds / report["total_seconds"] * 100 if report["total_seconds"] else 0.0
+        lines.append(f"  {stage}: {seconds:.2f}s ({share:.0f}%)")
+    if report["slowest"]:
+        lines.append("Slowest files:")
+        for file_path, seconds in report["slowest"]:
+            lines.append(f"  {file_path}: {seconds:.2f}s")
+    return "\n".join(lines)
+
+class WatchEventHandler(FileSystemEventHandler):
+    """
+    Wake the watch loop whenever anything changes under the watched folder
+    """
+    def __init__(self, changed):
+        super().__init__()
+        self.changed = changed
+
+    def on_any_event(self, event):
+        self.changed.set()
+
+def iter_watch_tasks(input_dir, output_dir, options, debounce=10.0, poll_interval=2.0, stop_event=None):
+    """
+    Yield (input_file, output_dir, options) for WAV files that land under
+    input_dir once their size and mtime have stayed unchanged for debounce
+    seconds, and None between checks. Runs until stop_event is set or the
+    generator is closed, which also stops the watchdog observer. Uses
+    watchdog (inotify on Linux) when installed and polls otherwise. Only
+    files still in input_dir are remembered, so deleted or moved
+    recordings are forgotten on the next scan.
+    """
+    stop_event = stop_event or threading.Event()
+    changed = threading.Event()
+    changed.set()  # the first pass picks up recordings already in the folder
+    observer = None
+    if Observer is not None:
+        observer = Observer()
+        observer.schedule(WatchEventHandler(changed), input_dir, recursive=True)
+        observer.start()
+        logger.info(f"Watching '{input_dir}' for filesystem events")
+    else:
+        logger.info(f"Polling '{input_dir}' every {poll_interval}s for new recordings")
+
+    candidates = {}  # path -> (size, mtime_ns, time the signature was first seen)
+    queued = {}  # path -> (size, mtime_ns) already handed to the split engine
+    try:
+        while not stop_event.is_set():
+            now = time.monotonic()
+            full_scan = observer is None or changed.is_set()
+            if full_scan:
+                changed.clear()
+                paths = list(iter_wav_files(input_dir, exclude_dirs=[output_dir]))
+                present = set(paths)
+                for state in (queued, candidates):
+                    for path in [path for path in state if path not in present]:
+                        del state[path]
+            else:
+                # Nothing new on disk; only files still settling need a fresh stat
+                paths = list(candidates)
+            for path in paths:
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    candidates.pop(path, None)
+                    continue
+                signature = (stat.st_size, stat.st_mtime_ns)
+                if stat.st_size == 0 or queued.get(path) == signature:
+                    continue
+                previous = candidates.get(path)
+                if previous is None or previous[:2] != signature:
+                    candidates[path] = (*signature, now)
+
+            for path, (size, mtime_ns, since) in list(candidates.items()):
+                if now - since >= debounce:
+                    del candidates[path]
+                    queued[path] = (size, mtime_ns)
+                    logger.info(f"Recording ready: {path}")
+                    yield (path, get_mirrored_output_dir(path, input_dir, output_dir), options)
+            yield None
+
+            if observer is None:
+                stop_event.wait(poll_interval)
+            else:
+                changed.wait(poll_interval)
+    finally:
+        if observer is not None:
+            observer.stop()
+            observer.join()
+
+class WAVMetadataReader:
+    def __init__(self, filepath):
+        self.filepath = filepath
+        self.metadata = {}
+        self.read_metadata()
+    
+    def read_metadata(self):
+        try:
+            with open(self.filepath, 'rb') as file:
+                # Only the metadata chunks are read, never the audio payload
+                for chunk_id, offset, chunk_size in iter_wav_chunks(file):
+                    if chunk_id == b'bext':
+                        file.seek(offset)
+                        self.read_bext_chunk(io.BytesIO(file.read(chunk_size)))
+                    elif chunk_id == b'iXML':
+                        file.seek(offset)
+                        self.read_ixml_chunk(file.read(chunk_size))
+        except Exception as e:
+            logger.error(f"Error reading metadata: {e}")
+
+    def read_bext_chunk(self, file):
+        """
+        Parse a bext chunk from a file-like object holding exactly the chunk data
+        """
+        try:
+            self.metadata['Description'] = self.read_string(file.read(256))
+            self.metadata['Originator'] = self.read_string(file.read(32))
+            self.metadata['OriginatorReference'] = self.read_string(file.read(32))
+            self.metadata['OriginationDate'] = self.read_string(file.read(10))
+            self.metadata['OriginationTime'] = self.read_string(file.read(8))
+            self.metadata['TimeReference'] = str(struct.unpack('<Q', file.read(8))[0])
+            self.metadata['Version'] = str(struct.unpack('<H', file.read(2))[0])
+            self.metadata['UMID'] = file.read(64).hex()
+            
+            # Read loudness metadata
+            # Signed hundredths of LUFS, LU and dBTP
+            self.metadata['LoudnessValue'] = str(struct.unpack('<h', file.read(2))[0])
+            self.metadata['LoudnessRange'] = str(struct.unpack('<h', file.read(2))[0])
+            self.metadata['MaxTruePeakLevel'] = str(struct.unpack('<h', file.read(2))[0])
+            self.metadata['MaxMomentaryLoudness'] = str(struct.unpack('<h', file.read(2))[0])
+            self.metadata['MaxShortTermLoudness'] = str(struct.unpack('<h', file.read(2))[0])
+            
+            # Reserved bytes
+            file.seek(180, 1)
+            
+            # Coding history (remaining bytes in chunk)
+            self.metadata['CodingHistory'] = self.read_string(file.read())
+            
+        except Exception as e:
+            logger.error(f"Error reading BEXT chunk: {e}")
+
+    def read_ixml_chunk(self, xml_data):
+        try:
+            xml_str = xml_data.decode('utf-8', errors='ignore')
+            root = ET.fromstring(xml_str)
+            
+            # Standard iXML fields
+            xml_tags = {
+                'NOTE': 'Note',
+                'PROJECT': 'Project',
+                'TAPE': 'Tape',
+                'SCENE': 'Scene',
+                'TAKE': 'Take',
+                'FILE_UID': 'FileUID',
+                'UBITS': 'UserBits',
+                'CIRCLED': 'CircleTake'
+            }
+            
+            for xml_tag, meta_key in xml_tags.items():
+                element = root.find(f'.//{xml_tag}')
+                if element is not None and element.text:
+                    self.metadata[meta_key] = element.text.strip()
+                    
+            # Category metadata
+            attr_list = root.findall('.//ATTR_LIST/ATTR')
+            for attr in attr_list:
+                name = attr.find('NAME')
+                value = attr.find('VALUE')
+                if name is not None and name.text == 'MusicalCategory' and value is not None:
+                    parts = value.text.split('/')
+                    if len(parts) >= 2:
+                        self.metadata['Category'] = parts[0].strip()
+                        self.metadata['Subcategory'] = parts[1].strip()
+                    else:
+                        self.metadata['Category'] = value.text.strip()
+                        
+        except Exception as e:
+            logger.error(f"Error reading iXML chunk: {e}")
+
+    def read_string(self, data):
+        try:
+            return data.split(b'\x00')[0].decode('utf-8').strip()
+        except:
+            return ''
+        
+
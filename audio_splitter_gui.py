@@ -14,23 +14,33 @@ def resource_path(relative_path):
         base_path = os.path.abspath(".")
     return os.path.join(base_path, relative_path)
 
-# Set the TKDND_LIBRARY environment variable before importing tkinterdnd2
-if getattr(sys, "frozen", False):
-    tkdnd_path = resource_path("tkdnd")
-else:
-    tkdnd_path = os.path.join(os.path.dirname(__file__), "tkdnd")
-os.environ["TKDND_LIBRARY"] = tkdnd_path
-
-# Optionally, add the tkdnd folder to sys.path
-if tkdnd_path not in sys.path:
-    sys.path.append(tkdnd_path)
-
-# --- Import tkinterdnd2 and other modules ---
-try:
-    from tkinterdnd2 import TkinterDnD, DND_FILES
-except ImportError as e:
-    print(f"Error importing tkinterdnd2: {e}")
-    sys.exit(1)
+# Batch workers are spawned processes that re-import this script as
+# __mp_main__, so everything that loads tkdnd, checks for FFmpeg or sets up
+# logging runs from the __main__ block below instead of at import time.
+TkinterDnD = None
+DND_FILES = None
+
+def setup_tkdnd():
+    """
+    Point tkinterdnd2 at the bundled tkdnd library and import it.
+    """
+    global TkinterDnD, DND_FILES
+    # Set the TKDND_LIBRARY environment variable before importing tkinterdnd2
+    if getattr(sys, "frozen", False):
+        tkdnd_path = resource_path("tkdnd")
+    else:
+        tkdnd_path = os.path.join(os.path.dirname(__file__), "tkdnd")
+    os.environ["TKDND_LIBRARY"] = tkdnd_path
+
+    # Optionally, add the tkdnd folder to sys.path
+    if tkdnd_path not in sys.path:
+        sys.path.append(tkdnd_path)
+
+    try:
+        from tkinterdnd2 import TkinterDnD, DND_FILES
+    except ImportError as e:
+        print(f"Error importing tkinterdnd2: {e}")
+        sys.exit(1)
 
 import tkinter as tk
 from tkinter import (
@@ -51,34 +61,52 @@ from tkinter import (
 import logging
 import traceback
 import threading
-import queue
-import struct
-import xml.etree.ElementTree as ET
+import time
+from collections import namedtuple
 from datetime import datetime
 import tempfile
 import shutil
-from pydub import AudioSegment
-from pydub.utils import which
 import subprocess
 import json
+import multiprocessing
+from audio_splitter_engine import (
+    ANALYSIS_FORMATS,
+    DEFAULT_STREAM_BLOCK_SIZE,
+    DUPLICATE_ACTIONS,
+    RESAMPLERS,
+    SILENT_ACTIONS,
+    VERIFICATION_POLICIES,
+    build_timing_report,
+    CancelToken,
+    find_ffmpeg_paths,
+    format_timing_report,
+    get_analysis_path,
+    get_application_root,
+    get_audio_data_size,
+    get_channel_labels,
+    get_log_file_path,
+    get_output_filename,
+    get_journal_path,
+    get_mirrored_output_dir,
+    get_progress_totals,
+    get_timings_path,
+    iter_wav_files,
+    make_split_options,
+    parse_channel_groups,
+    probe_audio_file,
+    remove_partial_outputs,
+    run_batch_tasks,
+    split_channels,
+    SplitCancelled,
+    ThroughputMeter,
+    write_analysis_sidecar,
+    write_timing_spans,
+)
 
 # --- Global Variables ---
 channel_checkboxes = []  # Used to store channel checkbox widgets
 notebook = None          # Global variable for the main notebook widget
-
-def resource_path(relative_path):
-    try:
-        base_path = sys._MEIPASS
-    except Exception:
-        base_path = os.path.abspath(".")
-    return os.path.join(base_path, relative_path)
-# Initialize tkdnd
-if getattr(sys, 'frozen', False):
-    tkdnd_path = resource_path('tkdnd')
-    os.environ['TKDND_LIBRARY'] = tkdnd_path
-else:
-    tkdnd_path = os.path.join(os.path.dirname(__file__), 'tkdnd')
-    os.environ['TKDND_LIBRARY'] = tkdnd_path
+active_cancel_token = None  # CancelToken of the split that is running, if any
 
 def toggle_sample_rate_dropdown():
     if override_sample_rate_var.get():
@@ -92,28 +120,6 @@ def toggle_bit_depth_dropdown():
     else:
         bit_depth_dropdown.config(state="disabled")
 
-def get_application_root():
-    if getattr(sys, "frozen", False):
-        app_root = sys._MEIPASS
-    else:
-        app_root = os.path.dirname(os.path.abspath(__file__))
-    return app_root
-
-tkdnd_path = os.path.join(get_application_root(), "tkdnd")
-if tkdnd_path not in sys.path:
-    sys.path.append(tkdnd_path)
-
-def get_log_file_path():
-    home = os.path.expanduser("~")
-    if sys.platform == "darwin":
-        log_dir = os.path.join(home, "Library", "Logs", "ZQSFXAudioSplitter")
-    elif sys.platform == "win32":
-        log_dir = os.path.join(home, "AppData", "Local", "ZQSFXAudioSplitter", "Logs")
-    else:
-        log_dir = os.path.join(home, ".ZQSFXAudioSplitter", "logs")
-    os.makedirs(log_dir, exist_ok=True)
-    return os.path.join(log_dir, "app.log")
-
 def setup_logging():
     try:
         log_file_path = get_log_file_path()
@@ -175,7 +181,7 @@ def handle_drop(event, dir_var, message_queue):
         if os.path.isdir(dropped_path):
             dir_var.set(dropped_path)
             logger.debug(f"Directory set via drag-and-drop: {dropped_path}")
-            update_file_count()
+            update_file_count(message_queue)
             update_button_states()
         elif os.path.isfile(dropped_path):
             if dir_var == single_file_var:
@@ -194,44 +200,44 @@ def handle_drop(event, dir_var, message_queue):
         logger.debug(traceback.format_exc())
         message_queue.put(("error", "Error", f"Error handling drag-and-drop: {e}"))
 
-setup_logging()
 logger = logging.getLogger(__name__)
 
 last_input_dir = os.path.expanduser("~")
 last_output_dir = os.path.expanduser("~")
+# Bytes of interleaved audio read per block by the native streaming engine
+stream_block_size = DEFAULT_STREAM_BLOCK_SIZE
+# Worker processes used by Batch Split
+batch_workers = os.cpu_count() or 1
+# Output metadata verification policy (see VERIFICATION_POLICIES) and debug_metadata/ dumps
+metadata_verification = "off"
+debug_metadata_dumps = False
+# Skip batch outputs that the output folder's split journal shows are up to date
+resume_batches = True
+# FFmpeg resampler used when the sample rate is overridden (see RESAMPLERS)
+sample_rate_resampler = "swr"
+# Batch channel group map such as "1-2:stereo,3-7:5.0,8:mono"; empty for mono files
+channel_group_map = ""
+# Batch outputs peaking below this dBFS level are silent (None keeps all), and
+# are removed or moved to a "silent" folder (see SILENT_ACTIONS)
+silence_threshold_db = None
+silent_channel_action = "skip"
+# Bit-identical batch outputs become hard links or manifest entries (see
+# DUPLICATE_ACTIONS); None writes every output
+duplicate_channel_action = None
+# Per-channel analysis sidecar format of batch splits (see ANALYSIS_FORMATS, None
+# for no analysis) and whether to fill the bext loudness fields of the outputs
+channel_analysis = None
+bext_loudness = False
+# Write a min/max waveform overview (see PEAK_FILE_SUFFIX) next to every output
+waveform_peak_files = False
 last_dir = os.path.expanduser("~")
+# Set by setup_ffmpeg in the GUI process
+ffmpeg_path = None
+ffprobe_path = None
 
 def get_ffmpeg_paths():
-    app_root = get_application_root()
-
-    if os.name == "nt":
-        ffmpeg_filename = "ffmpeg.exe"
-        ffprobe_filename = "ffprobe.exe"
-    else:
-        ffmpeg_filename = "ffmpeg"
-        ffprobe_filename = "ffprobe"
-
-    ffmpeg_path = os.path.join(app_root, "ffmpeg", ffmpeg_filename)
-    ffprobe_path = os.path.join(app_root, "ffmpeg", ffprobe_filename)
-
-    if not os.path.exists(ffmpeg_path):
-        logger.debug(f"FFmpeg not found in '{ffmpeg_path}'. Searching in system PATH.")
-        ffmpeg_path = which("ffmpeg")
-    if not os.path.exists(ffprobe_path):
-        logger.debug(
-            f"FFprobe not found in '{ffprobe_path}'. Searching in system PATH."
-        )
-        ffprobe_path = which("ffprobe")
-
-    logger.debug(f"FFmpeg Path: {ffmpeg_path}")
-    logger.debug(f"FFprobe Path: {ffprobe_path}")
-
-    if (
-        ffmpeg_path
-        and ffprobe_path
-        and os.path.exists(ffmpeg_path)
-        and os.path.exists(ffprobe_path)
-    ):
+    ffmpeg_path, ffprobe_path = find_ffmpeg_paths()
+    if ffmpeg_path and ffprobe_path:
         logger.info(f"Using FFmpeg at: {ffmpeg_path}")
         logger.info(f"Using FFprobe at: {ffprobe_path}")
         return ffmpeg_path, ffprobe_path
@@ -243,70 +249,37 @@ def get_ffmpeg_paths():
         )
         sys.exit(1)
 
-def get_bits_per_sample(file_path, ffprobe_path):
-    try:
-        cmd = [
-            ffprobe_path,
-            "-v",
-            "error",
-            "-select_streams",
-            "a:0",
-            "-show_entries",
-            "stream=bits_per_sample",
-            "-of",
-            "default=noprint_wrappers=1:nokey=1",
-            file_path,
-        ]
-        output = subprocess.check_output(cmd).decode().strip()
-        bits_per_sample = int(output)
-        logger.debug(f"Bits per sample for '{file_path}': {bits_per_sample}")
-        return bits_per_sample
-    except subprocess.CalledProcessError as e:
-        logger.error(f"FFprobe error for '{file_path}': {e}")
-        logger.debug(traceback.format_exc())
-        return None
-    except Exception as e:
-        logger.error(f"Error getting bits per sample for '{file_path}': {e}")
-        logger.debug(traceback.format_exc())
-        return None
-
-def get_sample_fmt(bits_per_sample):
-    mapping = {8: "u8", 16: "s16", 24: "s24", 32: "s32"}
-    sample_fmt = mapping.get(bits_per_sample)
-    if sample_fmt is None:
-        logger.error(f"Unsupported bits per sample: {bits_per_sample}")
-    else:
-        logger.debug(
-            f"Mapped bits_per_sample {bits_per_sample} to sample_fmt {sample_fmt}"
-        )
-    return sample_fmt
-
+def setup_ffmpeg():
+    """
+    Find FFmpeg, exiting with an error dialog when it is missing, and point
+    pydub and the PATH at it.
+    """
+    global ffmpeg_path, ffprobe_path
+    from pydub import AudioSegment
 
-ffmpeg_path, ffprobe_path = get_ffmpeg_paths()
+    ffmpeg_path, ffprobe_path = get_ffmpeg_paths()
 
-AudioSegment.converter = ffmpeg_path
-AudioSegment.ffprobe = ffprobe_path
-logger.debug(f"AudioSegment.ffprobe set to: {AudioSegment.ffprobe}")
+    AudioSegment.converter = ffmpeg_path
+    AudioSegment.ffprobe = ffprobe_path
+    logger.debug(f"AudioSegment.ffprobe set to: {AudioSegment.ffprobe}")
 
-ffmpeg_dir = os.path.dirname(ffmpeg_path)
-if ffmpeg_dir not in os.environ["PATH"]:
-    os.environ["PATH"] += os.pathsep + ffmpeg_dir
-    logger.debug(
-        f"Updated PATH environment variable with ffmpeg directory: {ffmpeg_dir}"
-    )
+    ffmpeg_dir = os.path.dirname(ffmpeg_path)
+    if ffmpeg_dir not in os.environ["PATH"]:
+        os.environ["PATH"] += os.pathsep + ffmpeg_dir
+        logger.debug(
+            f"Updated PATH environment variable with ffmpeg directory: {ffmpeg_dir}"
+        )
 
 def split_audio_files(
     input_dir,
     output_dir,
-    progress_var,
-    progress_bar,
-    total_files,
     message_queue,
     ffprobe_path,
     override_sample_rate,
     override_bit_depth,
     naming_scheme,
     custom_names,
+    cancel_token=None,
 ):
     try:
         if not os.path.isdir(input_dir):
@@ -319,104 +292,129 @@ def split_audio_files(
         os.makedirs(output_dir, exist_ok=True)
         logger.debug(f"Output directory '{output_dir}' is ready.")
 
-        wav_files = [
-            f
-            for f in os.listdir(input_dir)
-            if os.path.isfile(os.path.join(input_dir, f)) and f.lower().endswith(".wav")
-        ]
-        if not wav_files:
-            logger.error(f"No .wav files found in directory '{input_dir}'.")
-            message_queue.put(
-                ("error", "Error", f"No .wav files found in directory '{input_dir}'.")
-            )
-            return
-
-        logger.info(f"Found {len(wav_files)} .wav file(s) to process.")
         processed_files = 0
         error_files = 0
+        skipped_outputs = 0
+        silent_outputs = []
+        duplicate_outputs = 0
+        linked_outputs = 0
+        byte_progress = ByteProgress(0, 0.0, message_queue)
 
-        for idx, wav_file in enumerate(wav_files):
-            input_file = os.path.join(input_dir, wav_file)
-            logger.info(f"Processing file: {input_file}")
-
-            progress = int(((idx + 1) / total_files) * 100)
-            progress_var.set(progress)
-            progress_bar["value"] = progress
-            message_queue.put(("progress", "Progress", f"{progress}%"))
-            progress_bar.update_idletasks()
+        try:
+            channel_groups = parse_channel_groups(channel_group_map) if channel_group_map else None
+        except ValueError as e:
+            logger.error(f"Invalid channel_group_map '{channel_group_map}': {e}")
+            message_queue.put(("error", "Error", f"Invalid channel group map:\n{e}"))
+            return
 
-            try:
-                # Get channel count using ffprobe
-                cmd = [
-                    ffprobe_path,
-                    "-v", "error",
-                    "-select_streams", "a:0",
-                    "-show_entries", "stream=channels",
-                    "-of", "default=noprint_wrappers=1:nokey=1",
-                    input_file
-                ]
-                output = subprocess.check_output(cmd).decode().strip()
-                total_channels = int(output)
-                logger.debug(f"Total channels in '{wav_file}': {total_channels}")
-            except Exception as e:
-                logger.error(f"Error determining total channels for '{wav_file}': {e}")
-                message_queue.put(
-                    ("error", "Error", f"Error determining total channels for '{wav_file}': {e}")
-                )
-                error_files += 1
-                continue
+        options = make_split_options(
+            naming_scheme=naming_scheme,
+            custom_names=custom_names,
+            override_bit_depth=override_bit_depth,
+            override_sample_rate=override_sample_rate,
+            resampler=sample_rate_resampler,
+            channel_groups=channel_groups,
+            silence_threshold_db=silence_threshold_db,
+            silent_action=silent_channel_action,
+            duplicate_action=duplicate_channel_action,
+            analysis=channel_analysis,
+            bext_loudness=bext_loudness,
+            peak_files=waveform_peak_files,
+            block_size=stream_block_size,
+            verification=metadata_verification,
+            debug_dumps=debug_metadata_dumps,
+            journal_path=get_journal_path(output_dir),
+            resume=resume_batches,
+        )
 
-            # Process each channel
-            for channel_idx in range(total_channels):
+        def discover_tasks():
+            # Files are handed to the workers as the walk finds them
+            for input_file in iter_wav_files(input_dir, exclude_dirs=[output_dir]):
                 try:
-                    base_name, _ = os.path.splitext(wav_file)
-                    if naming_scheme == "custom" and channel_idx < len(custom_names):
-                        output_filename = f"{base_name}_{custom_names[channel_idx].strip()}.wav"
-                    else:
-                        output_filename = f"{base_name}_chan{channel_idx + 1}.wav"
-                    output_file = os.path.join(output_dir, output_filename)
-                    
-                    success = run_ffmpeg_with_metadata(
-                        input_file,
-                        channel_idx,
-                        output_file,
-                        override_bit_depth,
-                        override_sample_rate
-                    )
-                    
-                    if success:
-                        logger.info(f"Exported with metadata: {output_file}")
-                    else:
-                        raise Exception("Failed to export with metadata")
-                        
+                    byte_progress.add_total(*get_progress_totals(input_file))
                 except Exception as e:
-                    logger.error(f"Error processing channel {channel_idx + 1} of '{wav_file}': {e}")
-                    logger.debug(traceback.format_exc())
-                    message_queue.put(
-                        ("error", "Error", f"Error processing channel {channel_idx + 1} of '{wav_file}': {e}")
-                    )
-                    error_files += 1
-                    continue
+                    logger.warning(f"Could not size '{input_file}': {e}")
+                yield (
+                    input_file,
+                    get_mirrored_output_dir(input_file, input_dir, output_dir),
+                    options,
+                )
 
-            processed_files += 1
+        timings_path = get_timings_path(output_dir)
 
-        # Remove debug_metadata folder after processing all files
-        debug_metadata_path = os.path.join(output_dir, "debug_metadata")
-        if os.path.exists(debug_metadata_path):
-            try:
-                shutil.rmtree(debug_metadata_path)
-                logger.debug(f"Removed debug_metadata folder at {debug_metadata_path}")
-            except Exception as e:
-                logger.error(f"Failed to remove debug_metadata folder: {e}")
-                message_queue.put(("error", "Error", f"Failed to remove debug_metadata folder: {e}"))
+        def on_result(idx, result):
+            # Files finish out of order when several workers are running
+            write_timing_spans(timings_path, result)
+            if not result["success"] and not result["cancelled"]:
+                message_queue.put(("error", "Error", result["error"]))
 
-        progress_var.set(100)
-        progress_bar["value"] = 100
-        message_queue.put(("progress", None, "100%"))
-        progress_bar.update_idletasks()
+        workers = batch_workers or os.cpu_count() or 1
+        logger.info(f"Splitting with {workers} worker(s).")
+        results = run_batch_tasks(
+            discover_tasks(), workers, on_result, byte_progress, cancel_token
+        )
+        if channel_analysis and results:
+            write_analysis_sidecar(
+                get_analysis_path(output_dir, channel_analysis), results, channel_analysis
+            )
+        if cancel_token and cancel_token.is_cancelled():
+            finished = sum(1 for result in results if result["success"])
+            logger.info(f"Batch cancelled after {finished} file(s).")
+            message_queue.put(
+                (
+                    "info",
+                    "Processing Cancelled",
+                    f"Cancelled. {finished} file(s) were split before the batch stopped; "
+                    "partial outputs were removed.",
+                )
+            )
+            return
+        if not results:
+            logger.error(f"No .wav files found in directory '{input_dir}'.")
+            message_queue.put(
+                ("error", "Error", f"No .wav files found in directory '{input_dir}'.")
+            )
+            return
+        logger.info(f"Found {len(results)} .wav file(s) to process.")
+
+        for result in results:
+            skipped_outputs += len(result["skipped"])
+            silent_outputs.extend(result["silent"])
+            duplicate_outputs += len(result["duplicates"])
+            linked_outputs += sum(1 for duplicate in result["duplicates"] if duplicate["linked"])
+            if result["success"]:
+                processed_files += 1
+            else:
+                error_files += 1
+        logger.info(
+            f"Processed {processed_files} file(s), {error_files} failed, "
+            f"{skipped_outputs} up-to-date output(s) skipped, "
+            f"{len(silent_outputs)} silent output(s) set aside, "
+            f"{duplicate_outputs} duplicate output(s) ({linked_outputs} linked, "
+            f"{duplicate_outputs - linked_outputs} listed in a manifest)."
+        )
 
-        # Replace detailed summary with "SUCCESS!"
-        message_queue.put(("info", "Processing Complete", "SUCCESS!"))
+        # Remove debug_metadata folder after processing all files
+        remove_debug_metadata_dir(output_dir, message_queue)
+
+        timing_report = format_timing_report(build_timing_report(results))
+        logger.info(f"Batch timing report:\n{timing_report}")
+
+        message_queue.put(UIEvent("progress", message="100%", value=100))
+
+        summary = f"SUCCESS!\n\n{timing_report}"
+        if silent_outputs:
+            action = "Quarantined" if silent_channel_action == "quarantine" else "Skipped"
+            names = [os.path.basename(silent["output"]) for silent in silent_outputs]
+            if len(names) > 10:
+                names = names[:10] + [f"... and {len(names) - 10} more"]
+            summary += f"\n\n{action} {len(silent_outputs)} silent output(s):\n" + "\n".join(names)
+        if duplicate_outputs:
+            summary += (
+                f"\n\n{duplicate_outputs} bit-identical output(s): {linked_outputs} linked, "
+                f"{duplicate_outputs - linked_outputs} listed in a manifest."
+            )
+        message_queue.put(("info", "Processing Complete", summary))
         logger.info("Audio splitting process completed.")
 
     except Exception as e:
@@ -424,7 +422,7 @@ def split_audio_files(
         logger.debug(traceback.format_exc())
         message_queue.put(("error", "Error", f"An unexpected error occurred:\n{e}"))
     finally:
-        split_button.config(state="normal")  # Re-enable the split button
+        message_queue.put(("enable_buttons", None, None))
 
 def open_output_directory(output_dir):
     try:
@@ -449,7 +447,7 @@ def browse_input_dir(message_queue):
             input_dir_var.set(directory)
             logger.debug(f"Selected input directory: {directory}")
             last_dir = directory
-            update_file_count()
+            update_file_count(message_queue)
             update_button_states()
     except Exception as e:
         logger.error(f"Error selecting input directory: {e}")
@@ -471,13 +469,23 @@ def browse_output_dir(message_queue):
         logger.debug(traceback.format_exc())
         message_queue.put(("error", "Error", f"Error selecting output directory: {e}"))
 
-def update_file_count():
+def update_file_count(message_queue):
     input_dir = input_dir_var.get()
-    if os.path.isdir(input_dir):
-        wav_files = [f for f in os.listdir(input_dir) if f.lower().endswith(".wav")]
-        file_count_var.set(f"Files to process: {len(wav_files)}")
-    else:
+    if not os.path.isdir(input_dir):
         file_count_var.set("Files to process: 0")
+        return
+
+    def count_files():
+        # Walking nested folders on a network share can take a while, so count
+        # off the Tk thread and post running totals back through the queue
+        count = 0
+        for count, _ in enumerate(iter_wav_files(input_dir), 1):
+            if count % 100 == 0:
+                message_queue.put(("file_count", input_dir, f"Files to process: {count}..."))
+        message_queue.put(("file_count", input_dir, f"Files to process: {count}"))
+
+    file_count_var.set("Files to process: counting...")
+    threading.Thread(target=count_files, daemon=True).start()
 
 def run_splitter(message_queue):
     split_button.config(state="disabled")
@@ -519,13 +527,6 @@ def run_splitter(message_queue):
 
         split_button.config(state="disabled")
 
-        wav_files = [
-            f
-            for f in os.listdir(input_dir)
-            if os.path.isfile(os.path.join(input_dir, f)) and f.lower().endswith(".wav")
-        ]
-        total_files = len(wav_files) if wav_files else 1
-
         override_sample_rate = (
             int(sample_rate_var.get().split()[0])
             if override_sample_rate_var.get()
@@ -564,15 +565,13 @@ def run_splitter(message_queue):
             args=(
                 input_dir,
                 output_dir,
-                progress_var,
-                progress_bar,
-                total_files,
                 message_queue,
                 ffprobe_path,
                 override_sample_rate,
                 override_bit_depth,
                 naming_scheme,
                 custom_names,
+                start_cancel_token(),
             ),
             daemon=True,
         ).start()
@@ -612,13 +611,46 @@ def open_file_directory(file_path):
 CONFIG_FILE = os.path.join(get_application_root(), "config.json")
 
 def load_config():
-    global last_input_dir, last_output_dir
+    global last_input_dir, last_output_dir, stream_block_size, batch_workers
+    global metadata_verification, debug_metadata_dumps, resume_batches, sample_rate_resampler
+    global channel_group_map, silence_threshold_db, silent_channel_action
+    global duplicate_channel_action, channel_analysis, bext_loudness, waveform_peak_files
     if os.path.exists(CONFIG_FILE):
         try:
             with open(CONFIG_FILE, "r") as f:
                 config = json.load(f)
                 last_input_dir = config.get("last_input_dir", os.path.expanduser("~"))
                 last_output_dir = config.get("last_output_dir", os.path.expanduser("~"))
+                stream_block_size = int(config.get("stream_block_size", stream_block_size))
+                batch_workers = int(config.get("batch_workers", batch_workers))
+                metadata_verification = config.get("metadata_verification", metadata_verification)
+                if metadata_verification not in VERIFICATION_POLICIES:
+                    logger.warning(f"Unknown metadata_verification '{metadata_verification}', using 'off'")
+                    metadata_verification = "off"
+                debug_metadata_dumps = bool(config.get("debug_metadata_dumps", debug_metadata_dumps))
+                resume_batches = bool(config.get("resume_batches", resume_batches))
+                sample_rate_resampler = config.get("sample_rate_resampler", sample_rate_resampler)
+                if sample_rate_resampler not in RESAMPLERS:
+                    logger.warning(f"Unknown sample_rate_resampler '{sample_rate_resampler}', using 'swr'")
+                    sample_rate_resampler = "swr"
+                channel_group_map = config.get("channel_group_map", channel_group_map)
+                silence_threshold_db = config.get("silence_threshold_db", silence_threshold_db)
+                if silence_threshold_db is not None:
+                    silence_threshold_db = float(silence_threshold_db)
+                silent_channel_action = config.get("silent_channel_action", silent_channel_action)
+                if silent_channel_action not in SILENT_ACTIONS:
+                    logger.warning(f"Unknown silent_channel_action '{silent_channel_action}', using 'skip'")
+                    silent_channel_action = "skip"
+                duplicate_channel_action = config.get("duplicate_channel_action", duplicate_channel_action)
+                if duplicate_channel_action not in (None,) + DUPLICATE_ACTIONS:
+                    logger.warning(f"Unknown duplicate_channel_action '{duplicate_channel_action}', writing every output")
+                    duplicate_channel_action = None
+                channel_analysis = config.get("channel_analysis", channel_analysis)
+                if channel_analysis not in (None,) + ANALYSIS_FORMATS:
+                    logger.warning(f"Unknown channel_analysis '{channel_analysis}', skipping the analysis")
+                    channel_analysis = None
+                bext_loudness = bool(config.get("bext_loudness", bext_loudness))
+                waveform_peak_files = bool(config.get("waveform_peak_files", waveform_peak_files))
                 logger.debug(f"Loaded config: {config}")
         except Exception as e:
             logger.error(f"Error loading config: {e}")
@@ -627,7 +659,23 @@ def load_config():
         last_output_dir = last_input_dir
 
 def save_config():
-    config = {"last_input_dir": last_input_dir, "last_output_dir": last_output_dir}
+    config = {
+        "last_input_dir": last_input_dir,
+        "last_output_dir": last_output_dir,
+        "stream_block_size": stream_block_size,
+        "batch_workers": batch_workers,
+        "metadata_verification": metadata_verification,
+        "debug_metadata_dumps": debug_metadata_dumps,
+        "resume_batches": resume_batches,
+        "sample_rate_resampler": sample_rate_resampler,
+        "channel_group_map": channel_group_map,
+        "silence_threshold_db": silence_threshold_db,
+        "silent_channel_action": silent_channel_action,
+        "duplicate_channel_action": duplicate_channel_action,
+        "channel_analysis": channel_analysis,
+        "bext_loudness": bext_loudness,
+        "waveform_peak_files": waveform_peak_files,
+    }
     try:
         with open(CONFIG_FILE, "w") as f:
             json.dump(config, f)
@@ -637,6 +685,9 @@ def save_config():
         logger.debug(traceback.format_exc())
 
 def on_closing(root, message_queue):
+    # Stop a running split so its workers do not outlive the window
+    if active_cancel_token is not None:
+        active_cancel_token.cancel()
     save_config()
     logger.info("Configuration saved. Exiting application.")
     root.destroy()
@@ -670,13 +721,81 @@ def browse_single_file(message_queue):
         logger.error(f"Error selecting file: {e}")
         message_queue.put(("error", "Error", f"Error selecting file: {e}"))
 
-def split_single_file(message_queue):
+def run_single_file_split(message_queue):
+    """
+    Read the Single File settings on the Tk thread and split on a worker thread
+    """
     split_button.config(state="disabled")
     open_output_button.config(state="disabled")  # Temporarily disable if needed
     open_input_file_button.config(state="disabled")  # Temporarily disable if needed
+    naming_scheme = naming_scheme_var.get()
+    custom_names = (
+        custom_names_var.get().split(",") if naming_scheme == "custom" else []
+    )
+    threading.Thread(
+        target=split_single_file,
+        args=(
+            single_file_var.get(),
+            output_dir_var.get(),
+            [var.get() for var in channel_vars],
+            int(bit_depth_var.get().split()[0]) if override_bit_depth_var.get() else None,
+            int(sample_rate_var.get().split()[0]) if override_sample_rate_var.get() else None,
+            naming_scheme,
+            custom_names,
+            message_queue,
+            start_cancel_token(),
+        ),
+        daemon=True,
+    ).start()
+
+def start_cancel_token():
+    """
+    Create the CancelToken of a new split and enable the Pause and Cancel buttons
+    """
+    global active_cancel_token
+    active_cancel_token = CancelToken()
+    pause_button.config(state="normal", text="Pause")
+    cancel_button.config(state="normal")
+    return active_cancel_token
+
+def toggle_pause_split():
+    if active_cancel_token is None:
+        return
+    if active_cancel_token.is_paused():
+        active_cancel_token.resume()
+        pause_button.config(text="Pause")
+        logger.info("Split resumed.")
+    else:
+        active_cancel_token.pause()
+        pause_button.config(text="Resume")
+        logger.info("Split paused.")
+
+def cancel_split():
+    if active_cancel_token is None:
+        return
+    active_cancel_token.cancel()
+    pause_button.config(state="disabled", text="Pause")
+    cancel_button.config(state="disabled")
+    logger.info("Cancelling split...")
+
+def finish_cancel_token():
+    global active_cancel_token
+    active_cancel_token = None
+    pause_button.config(state="disabled", text="Pause")
+    cancel_button.config(state="disabled")
+
+def split_single_file(
+    file_path,
+    output_dir,
+    channel_flags,
+    override_bit_depth,
+    override_sample_rate,
+    naming_scheme,
+    custom_names,
+    message_queue,
+    cancel_token=None,
+):
     try:
-        file_path = single_file_var.get()
-        output_dir = output_dir_var.get()
         logger.debug(f"File Path: {file_path}")
         logger.debug(f"Output Directory: {output_dir}")
 
@@ -711,21 +830,8 @@ def split_single_file(message_queue):
 
         os.makedirs(output_dir, exist_ok=True)
 
-        cmd = [
-            ffprobe_path,
-            "-v",
-            "error",
-            "-select_streams",
-            "a:0",
-            "-show_entries",
-            "stream=channels",
-            "-of",
-            "default=noprint_wrappers=1:nokey=1",
-            file_path,
-        ]
         try:
-            output = subprocess.check_output(cmd).decode().strip()
-            total_channels = int(output)
+            total_channels = probe_audio_file(file_path, ffprobe_path)["channels"]
             logger.debug(f"Total channels in input file: {total_channels}")
         except Exception as e:
             logger.error(f"Error determining total channels for '{file_path}': {e}")
@@ -739,7 +845,7 @@ def split_single_file(message_queue):
             return
 
         selected_channels = [
-            idx for idx, var in enumerate(channel_vars[:total_channels]) if var.get()
+            idx for idx, selected in enumerate(channel_flags[:total_channels]) if selected
         ]
         if not selected_channels:
             message_queue.put(
@@ -751,18 +857,8 @@ def split_single_file(message_queue):
             )
             return
 
-        if override_bit_depth_var.get():
-            override_bit_depth = int(bit_depth_var.get().split()[0])
-        else:
-            override_bit_depth = None
+        message_queue.put(UIEvent("progress", message="0%", value=0))
 
-        progress_var.set(0)
-        progress_bar.config(maximum=100)
-
-        naming_scheme = naming_scheme_var.get()
-        custom_names = (
-            custom_names_var.get().split(",") if naming_scheme == "custom" else []
-        )
         custom_names = [name.strip() for name in custom_names]
 
         if naming_scheme == "custom" and len(custom_names) < total_channels:
@@ -775,42 +871,45 @@ def split_single_file(message_queue):
         logger.debug(f"Naming Scheme: {naming_scheme}")
         logger.debug(f"Custom Names: {custom_names}")
 
-        for idx in selected_channels:
-            if naming_scheme == "custom" and idx < len(custom_names):
-                output_filename = f"{os.path.splitext(os.path.basename(file_path))[0]}_{custom_names[idx]}.wav"
-            else:
-                output_filename = f"{os.path.splitext(os.path.basename(file_path))[0]}_chan{idx + 1}.wav"
-
-            output_file = os.path.join(output_dir, output_filename)
-            run_ffmpeg_with_metadata(
-                file_path,
+        base_name = os.path.splitext(os.path.basename(file_path))[0]
+        channel_outputs = [
+            (
                 idx,
-                output_file,
-                override_bit_depth,
-                override_sample_rate=(
-                    int(sample_rate_var.get().split()[0])
-                    if override_sample_rate_var.get()
-                    else None
+                os.path.join(
+                    output_dir,
+                    get_output_filename(base_name, idx, naming_scheme, custom_names),
                 ),
             )
-            progress = int(
-                ((selected_channels.index(idx) + 1) / len(selected_channels)) * 100
+            for idx in selected_channels
+        ]
+        try:
+            success = split_channels(
+                file_path,
+                channel_outputs,
+                override_bit_depth,
+                override_sample_rate=override_sample_rate,
+                progress_callback=ByteProgress(*get_progress_totals(file_path), message_queue),
+                verification=metadata_verification,
+                debug_dumps=debug_metadata_dumps,
+                cancel_token=cancel_token,
+                resampler=sample_rate_resampler,
+                block_size=stream_block_size,
+            )
+        except SplitCancelled:
+            remove_partial_outputs([output_file for _, output_file in channel_outputs])
+            logger.info(f"Split of '{file_path}' cancelled.")
+            message_queue.put(
+                ("info", "Splitting Cancelled", "Cancelled. Partial outputs were removed.")
+            )
+            return
+        if not success:
+            message_queue.put(
+                ("error", "Error", f"Failed to split '{os.path.basename(file_path)}'.")
             )
-            progress_var.set(progress)
-            message_queue.put(("progress", None, f"{progress}%"))
 
-        debug_metadata_path = os.path.join(output_dir, "debug_metadata")
-        if os.path.exists(debug_metadata_path):
-            try:
-                shutil.rmtree(debug_metadata_path)
-                logger.debug(f"Removed debug_metadata folder at {debug_metadata_path}")
-            except Exception as e:
-                logger.error(f"Failed to remove debug_metadata folder: {e}")
-                message_queue.put(("error", "Error", f"Failed to remove debug_metadata folder: {e}"))
+        remove_debug_metadata_dir(output_dir, message_queue)
 
-        progress_var.set(100)
-        progress_bar["value"] = 100
-        message_queue.put(("progress", None, "100%"))
+        message_queue.put(UIEvent("progress", message="100%", value=100))
 
         message_queue.put(
             (
@@ -823,147 +922,94 @@ def split_single_file(message_queue):
         logger.error(f"An unexpected error occurred: {e}")
         message_queue.put(("error", "Error", f"An unexpected error occurred:\n{e}"))
     finally:
-        split_button.config(state="normal")
-        open_output_button.config(state="normal")
-        open_input_file_button.config(state="normal")
+        message_queue.put(("enable_buttons", None, None))
 
-def run_ffmpeg_with_metadata(input_file, channel_idx, output_file, override_bit_depth=None, override_sample_rate=None):
+def remove_debug_metadata_dir(output_dir, message_queue):
     """
-    Process a single channel and preserve all metadata from source to output file
-    Uses WAVMetadataReader to read all BWF and iXML chunks
+    Remove debug_metadata/ after a split unless debug dumps were asked for
     """
-    try:
-        # Create debug directory for logging
-        debug_dir = os.path.join(os.path.dirname(output_file), "debug_metadata")
-        os.makedirs(debug_dir, exist_ok=True)
-        
-        # Read all metadata using the improved WAVMetadataReader
-        reader = WAVMetadataReader(input_file)
-        source_metadata = reader.metadata
-        
-        # Log source metadata
-        with open(os.path.join(debug_dir, "source_metadata.txt"), "w") as f:
-            f.write(json.dumps(source_metadata, indent=2))
-
-        # Build FFmpeg command with comprehensive metadata preservation
-        cmd = [
-            ffmpeg_path,
-            '-y',
-            '-i', input_file,
-            '-map_metadata', '0',  # Preserve global metadata
-            '-write_bext', '1',    # Enable BWF/BEXT writing
-            '-write_id3v2', '1',   # Preserve ID3 tags if present
-            '-map', '0:a:0',       # Map first audio stream
-            '-af', f'pan=mono|c0=c{channel_idx}',
-        ]
-
-        # Add sample rate if specified
-        if override_sample_rate:
-            cmd.extend(['-ar', str(override_sample_rate)])
+    if debug_metadata_dumps:
+        return
+    debug_metadata_path = os.path.join(output_dir, "debug_metadata")
+    if os.path.exists(debug_metadata_path):
+        try:
+            shutil.rmtree(debug_metadata_path)
+            logger.debug(f"Removed debug_metadata folder at {debug_metadata_path}")
+        except Exception as e:
+            logger.error(f"Failed to remove debug_metadata folder: {e}")
+            message_queue.put(("error", "Error", f"Failed to remove debug_metadata folder: {e}"))
 
-        # Add bit depth if specified
-        if override_bit_depth:
-            codec_mapping = {8: "pcm_u8", 16: "pcm_s16le", 24: "pcm_s24le", 32: "pcm_s32le"}
-            codec = codec_mapping.get(override_bit_depth, "pcm_s24le")
-            cmd.extend(['-c:a', codec])
-        else:
-            cmd.extend(['-c:a', 'pcm_s24le'])
-
-        # Add comprehensive metadata preservation flags
-        bwf_flags = [
-            '-metadata_header_padding', '8192',  # Increased padding for more metadata
-            '-rf64', 'auto',
-            '-fflags', '+bitexact',
-            '-map_metadata:s:a', '0:s:a',  # Copy stream metadata
-        ]
-        cmd.extend(bwf_flags)
-
-        # Map core BWF fields
-        bwf_fields = {
-            'Description': 'description',
-            'Originator': 'originator',
-            'Reference': 'originator_reference',
-            'OriginationDate': 'origination_date',
-            'OriginationTime': 'origination_time'
-        }
-
-        # Map additional metadata fields
-        ixml_fields = {
-            'Note': 'ixml_note',
-            'Scene': 'scene',
-            'Take': 'take',
-            'Tape': 'tape',
-            'Project': 'project',
-            'Category': 'category',
-            'Subcategory': 'subcategory'
-        }
-
-        # Add all BWF metadata
-        for source_key, ffmpeg_key in bwf_fields.items():
-            if source_key in source_metadata and source_metadata[source_key]:
-                cmd.extend(['-metadata', f'{ffmpeg_key}={source_metadata[source_key]}'])
-                # Also add as bext metadata for maximum compatibility
-                cmd.extend(['-metadata:s:a:0', f'bext_{ffmpeg_key}={source_metadata[source_key]}'])
-
-        # Add all iXML metadata
-        for source_key, ffmpeg_key in ixml_fields.items():
-            if source_key in source_metadata and source_metadata[source_key]:
-                cmd.extend(['-metadata', f'{ffmpeg_key}={source_metadata[source_key]}'])
-                # Add as both global and stream metadata
-                cmd.extend(['-metadata:s:a:0', f'ixml_{ffmpeg_key}={source_metadata[source_key]}'])
-
-        # Add output file
-        cmd.append(output_file)
-
-        # Log full command
-        with open(os.path.join(debug_dir, "ffmpeg_command.txt"), "w") as f:
-            f.write(" ".join(cmd))
-
-        # Execute command
-        process = subprocess.run(cmd, capture_output=True, text=True)
-        if process.returncode != 0:
-            logger.error(f"FFmpeg error: {process.stderr}")
-            with open(os.path.join(debug_dir, "error.txt"), "w") as f:
-                f.write(process.stderr)
-            return False
-
-        # Verify output metadata
-        output_reader = WAVMetadataReader(output_file)
-        output_metadata = output_reader.metadata
-
-        # Log output metadata
-        with open(os.path.join(debug_dir, "output_metadata.txt"), "w") as f:
-            f.write(json.dumps(output_metadata, indent=2))
-
-        # Compare metadata (excluding technical fields that will change)
-        excluded_fields = {'Duration', 'Format', 'NumChannels', 'Version', 
-                         'Number of Channels', 'Sample Width', 'Frame Rate', 
-                         'Number of Frames'}
-        
-        preserved = all(
-            key in output_metadata and output_metadata[key] == value
-            for key, value in source_metadata.items()
-            if value and key not in excluded_fields
-        )
+# Event posted from worker threads to the Tk thread. kind selects the
+# handler in process_queue; title, message and value are its arguments.
+UIEvent = namedtuple("UIEvent", ["kind", "title", "message", "value"], defaults=(None, None, None))
 
-        if not preserved:
-            logger.warning("Some metadata was not preserved")
-            with open(os.path.join(debug_dir, "metadata_diff.txt"), "w") as f:
-                f.write("=== Missing Metadata ===\n")
-                for key, value in source_metadata.items():
-                    if value and key not in output_metadata:
-                        f.write(f"{key}: {value}\n")
-                f.write("\n=== Changed Metadata ===\n")
-                for key, value in source_metadata.items():
-                    if value and key in output_metadata and output_metadata[key] != value:
-                        f.write(f"{key}:\n  Source: {value}\n  Output: {output_metadata[key]}\n")
+# Kinds where only the newest event matters; older ones are dropped unseen
+COALESCED_EVENT_KINDS = ("progress", "file_count")
 
-        return True
+# Upper bound on how often queued events are applied to the widgets
+MAX_UI_UPDATES_PER_SECOND = 10
 
-    except Exception as e:
-        logger.error(f"Error: {str(e)}")
-        traceback.print_exc()
-        return False
+class UIEventBus:
+    """
+    Thread-safe hand-off from worker threads to the Tk thread. Workers only
+    put events; the Tk thread drains them in one batch per redraw, so the GUI
+    cost stays flat however many files finish per second.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.events = []
+        self.latest = {}
+
+    def put(self, event):
+        event = UIEvent(*event)
+        with self.lock:
+            if event.kind in COALESCED_EVENT_KINDS:
+                self.latest[event.kind] = event
+            else:
+                self.events.append(event)
+
+    def drain(self):
+        """
+        Return the newest coalesced events, then the other events in order,
+        so the bar already shows 100% when a completion dialog opens
+        """
+        with self.lock:
+            events = list(self.latest.values()) + self.events
+            self.events = []
+            self.latest = {}
+        return events
+
+class ByteProgress:
+    """
+    Turn byte counts reported by the split engine into progress updates with
+    throughput, speed against realtime and an ETA
+    """
+    # Seconds between status updates while the percentage stands still
+    STATUS_INTERVAL = 0.5
+
+    def __init__(self, total_bytes, total_seconds, message_queue):
+        self.meter = ThroughputMeter(total_bytes, total_seconds)
+        self.message_queue = message_queue
+        self.last_progress = -1
+        self.last_post = 0.0
+
+    def add_total(self, num_bytes, seconds=0.0):
+        """
+        Grow the expected total as batch discovery finds more files
+        """
+        self.meter.add_total(num_bytes, seconds)
+
+    def __call__(self, num_bytes):
+        self.meter.add(num_bytes)
+        progress = self.meter.get_percent()
+        now = time.monotonic()
+        # Post when the percentage changes, and now and then for MB/s and ETA
+        if progress != self.last_progress or now - self.last_post >= self.STATUS_INTERVAL:
+            self.last_progress = progress
+            self.last_post = now
+            self.message_queue.put(
+                UIEvent("progress", message=self.meter.format_status(), value=progress)
+            )
 
 def add_placeholder(entry, placeholder_text):
     def on_focus_in(event):
@@ -1021,20 +1067,17 @@ def update_channel_checkboxes():
             logger.debug("File path is invalid or does not exist.")
             return
 
-        # Use ffprobe to get the number of channels quickly
-        cmd = [
-            ffprobe_path,
-            "-v", "error",
-            "-select_streams", "a:0",
-            "-show_entries", "stream=channels",
-            "-of", "default=noprint_wrappers=1:nokey=1",
-            file_path
-        ]
-        output = subprocess.check_output(cmd).decode().strip()
-        total_channels = int(output)
+        # Header probe for WAV files, so no process is spawned on the Tk thread
+        probe = probe_audio_file(file_path, ffprobe_path)
+        total_channels = probe["channels"]
+        channel_labels = get_channel_labels(probe.get("channel_mask"), total_channels)
         logger.debug(f"Number of channels from audio file: {total_channels}")
 
         for channel_idx, chk in channel_checkboxes:
+            if channel_idx < total_channels and channel_labels[channel_idx]:
+                chk.config(text=f"Channel {channel_idx + 1} ({channel_labels[channel_idx]})")
+            else:
+                chk.config(text=f"Channel {channel_idx + 1}")
             if channel_idx < total_channels:
                 chk.config(state="normal")
                 channel_vars[channel_idx].set(True)
@@ -1066,119 +1109,9 @@ browse_button_width = 10
 open_button_width = 5
 
 
-class WAVMetadataReader:
-    def __init__(self, filepath):
-        self.filepath = filepath
-        self.metadata = {}
-        self.read_metadata()
-    
-    def read_metadata(self):
-        try:
-            with open(self.filepath, 'rb') as file:
-                if file.read(4) != b'RIFF':
-                    return
-                    
-                file.seek(4, 1)  # Skip file size
-                
-                if file.read(4) != b'WAVE':
-                    return
-                
-                while True:
-                    try:
-                        chunk_id = file.read(4)
-                        if not chunk_id:
-                            break
-                            
-                        chunk_size = struct.unpack('<I', file.read(4))[0]
-                        
-                        if chunk_id == b'bext':
-                            # Read BEXT chunk completely
-                            self.read_bext_chunk(file)
-                        elif chunk_id == b'iXML':
-                            xml_data = file.read(chunk_size)
-                            self.read_ixml_chunk(xml_data)
-                        else:
-                            file.seek(chunk_size, 1)
-                            
-                    except struct.error:
-                        break
-        except Exception as e:
-            logger.error(f"Error reading metadata: {e}")
-
-    def read_bext_chunk(self, file):
-        try:
-            self.metadata['Description'] = self.read_string(file.read(256))
-            self.metadata['Originator'] = self.read_string(file.read(32))
-            self.metadata['OriginatorReference'] = self.read_string(file.read(32))
-            self.metadata['OriginationDate'] = self.read_string(file.read(10))
-            self.metadata['OriginationTime'] = self.read_string(file.read(8))
-            self.metadata['TimeReference'] = str(struct.unpack('<Q', file.read(8))[0])
-            self.metadata['Version'] = str(struct.unpack('<H', file.read(2))[0])
-            self.metadata['UMID'] = file.read(64).hex()
-            
-            # Read loudness metadata
-            self.metadata['LoudnessValue'] = str(struct.unpack('<H', file.read(2))[0])
-            self.metadata['LoudnessRange'] = str(struct.unpack('<H', file.read(2))[0])
-            self.metadata['MaxTruePeakLevel'] = str(struct.unpack('<H', file.read(2))[0])
-            self.metadata['MaxMomentaryLoudness'] = str(struct.unpack('<H', file.read(2))[0])
-            self.metadata['MaxShortTermLoudness'] = str(struct.unpack('<H', file.read(2))[0])
-            
-            # Reserved bytes
-            file.seek(180, 1)
-            
-            # Coding history (remaining bytes in chunk)
-            self.metadata['CodingHistory'] = self.read_string(file.read())
-            
-        except Exception as e:
-            logger.error(f"Error reading BEXT chunk: {e}")
-
-    def read_ixml_chunk(self, xml_data):
-        try:
-            xml_str = xml_data.decode('utf-8', errors='ignore')
-            root = ET.fromstring(xml_str)
-            
-            # Standard iXML fields
-            xml_tags = {
-                'NOTE': 'Note',
-                'PROJECT': 'Project',
-                'TAPE': 'Tape',
-                'SCENE': 'Scene',
-                'TAKE': 'Take',
-                'FILE_UID': 'FileUID',
-                'UBITS': 'UserBits',
-                'CIRCLED': 'CircleTake'
-            }
-            
-            for xml_tag, meta_key in xml_tags.items():
-                element = root.find(f'.//{xml_tag}')
-                if element is not None and element.text:
-                    self.metadata[meta_key] = element.text.strip()
-                    
-            # Category metadata
-            attr_list = root.findall('.//ATTR_LIST/ATTR')
-            for attr in attr_list:
-                name = attr.find('NAME')
-                value = attr.find('VALUE')
-                if name is not None and name.text == 'MusicalCategory' and value is not None:
-                    parts = value.text.split('/')
-                    if len(parts) >= 2:
-                        self.metadata['Category'] = parts[0].strip()
-                        self.metadata['Subcategory'] = parts[1].strip()
-                    else:
-                        self.metadata['Category'] = value.text.strip()
-                        
-        except Exception as e:
-            logger.error(f"Error reading iXML chunk: {e}")
-
-    def read_string(self, data):
-        try:
-            return data.split(b'\x00')[0].decode('utf-8').strip()
-        except:
-            return ''
-        
-
 def main():
     global split_button, open_output_directory_button, open_output_button, open_input_file_button, open_input_directory_button
+    global pause_button, cancel_button
     global notebook  # Declare notebook as global
     try:
         load_config()
@@ -1223,7 +1156,7 @@ def main():
         progress_var = IntVar()
         single_file_var = StringVar()
 
-        message_queue = queue.Queue()
+        message_queue = UIEventBus()
 
         root.protocol("WM_DELETE_WINDOW", lambda: on_closing(root, message_queue))
 
@@ -1729,6 +1662,26 @@ def main():
         )
         split_button.pack(side="left", expand=True, fill="x", padx=5, pady=5)
 
+        pause_button = ttk.Button(
+            bottom_buttons_frame,
+            text="Pause",
+            command=toggle_pause_split,
+            style="Custom.TButton",
+            state="disabled",
+            width=10,
+        )
+        pause_button.pack(side="left", padx=5, pady=5)
+
+        cancel_button = ttk.Button(
+            bottom_buttons_frame,
+            text="Cancel",
+            command=cancel_split,
+            style="Custom.TButton",
+            state="disabled",
+            width=10,
+        )
+        cancel_button.pack(side="left", padx=5, pady=5)
+
         # Define button tooltips after moving them
         ToolTip(
             split_button,
@@ -1736,6 +1689,18 @@ def main():
             FONT_FAMILY,
             FONT_SIZE,
         )
+        ToolTip(
+            pause_button,
+            "Pause or resume the running split.",
+            FONT_FAMILY,
+            FONT_SIZE,
+        )
+        ToolTip(
+            cancel_button,
+            "Stop the running split and remove its partial outputs.",
+            FONT_FAMILY,
+            FONT_SIZE,
+        )
 
         
 
@@ -1775,23 +1740,22 @@ def main():
 
                 processed_files = 0
                 error_files = 0
+                byte_progress = ByteProgress(
+                    sum(
+                        get_audio_data_size(os.path.join(file_base, f) if is_batch else input_path)
+                        for f in wav_files
+                    ),
+                    0.0,
+                    message_queue,
+                )
 
                 for idx, wav_file in enumerate(wav_files):
                     input_file = os.path.join(file_base, wav_file) if is_batch else input_path
                     file_report = [f"\n=== Processing {wav_file} ==="]
                     
                     # Get channel count
-                    cmd = [
-                        ffprobe_path,
-                        "-v", "error",
-                        "-select_streams", "a:0",
-                        "-show_entries", "stream=channels",
-                        "-of", "default=noprint_wrappers=1:nokey=1",
-                        input_file
-                    ]
-                    
                     try:
-                        total_channels = int(subprocess.check_output(cmd).decode().strip())
+                        total_channels = probe_audio_file(input_file, ffprobe_path)["channels"]
                         file_report.append(f"Detected {total_channels} channels")
                     except Exception as e:
                         error_msg = f"Error getting channel count: {e}"
@@ -1807,51 +1771,45 @@ def main():
                         current_selected_channels = selected_channels
 
                     # Process each selected channel
+                    channel_outputs = []
+                    base_name = os.path.splitext(wav_file)[0]
                     for channel_idx in current_selected_channels:
                         if channel_idx >= total_channels:
                             file_report.append(f"Skipping channel {channel_idx + 1} (exceeds available channels)")
                             continue
-                            
-                        base_name = os.path.splitext(wav_file)[0]
-                        if naming_scheme == "custom" and channel_idx < len(custom_names):
-                            output_filename = f"{base_name}_{custom_names[channel_idx]}.wav"
-                        else:
-                            output_filename = f"{base_name}_chan{channel_idx + 1}.wav"
-                            
-                        output_file = os.path.join(output_dir, output_filename)
-                        
-                        # Use run_ffmpeg_with_metadata directly instead of process_channel_with_metadata
-                        success = run_ffmpeg_with_metadata(
-                            input_file,
-                            channel_idx,
-                            output_file,
-                            override_bit_depth,
-                            override_sample_rate
+                        output_filename = get_output_filename(
+                            base_name, channel_idx, naming_scheme, custom_names
                         )
-                        
+                        channel_outputs.append(
+                            (channel_idx, os.path.join(output_dir, output_filename))
+                        )
+
+                    # Decode the source once and write every selected channel from it
+                    success = split_channels(
+                        input_file,
+                        channel_outputs,
+                        override_bit_depth,
+                        override_sample_rate,
+                        progress_callback=byte_progress,
+                        verification=metadata_verification,
+                        debug_dumps=debug_metadata_dumps,
+                        block_size=stream_block_size,
+                    )
+
+                    for channel_idx, _ in channel_outputs:
                         file_report.append(f"\nChannel {channel_idx + 1} Processing Result:")
                         if success:
                             file_report.append("Successfully processed with metadata preserved")
                         else:
                             file_report.append("Failed to process channel")
-                            error_files += 1
+                    if not success:
+                        error_files += 1
 
                     processed_files += 1
                     diagnostic_reports.extend(file_report)
-                    
-                    progress = int((processed_files / total_files) * 100)
-                    progress_var.set(progress)
-                    message_queue.put(("progress", None, f"{progress}%"))
 
                 # Remove debug_metadata folder after processing all files
-                debug_metadata_path = os.path.join(output_dir, "debug_metadata")
-                if os.path.exists(debug_metadata_path):
-                    try:
-                        shutil.rmtree(debug_metadata_path)
-                        logger.debug(f"Removed debug_metadata folder at {debug_metadata_path}")
-                    except Exception as e:
-                        logger.error(f"Failed to remove debug_metadata folder: {e}")
-                        message_queue.put(("error", "Error", f"Failed to remove debug_metadata folder: {e}"))
+                remove_debug_metadata_dir(output_dir, message_queue)
 
                 # Replace detailed summary with "SUCCESS!"
                 message_queue.put(("info", "Processing Complete", "SUCCESS!"))
@@ -1865,32 +1823,35 @@ def main():
     
 
         def process_queue():
-            try:
-                while True:
-                    msg_type, title, message = message_queue.get_nowait()
-                    if msg_type == "progress":
-                        progress_value = progress_var.get()
-                        progress_bar["value"] = progress_value
+            for event in message_queue.drain():
+                try:
+                    if event.kind == "progress":
+                        progress_var.set(event.value)
                         style.configure(
-                            "text.Horizontal.TProgressbar", text=f"{progress_value}%"
+                            "text.Horizontal.TProgressbar", text=event.message or f"{event.value}%"
                         )
-                        root.update_idletasks()
-                    elif msg_type == "error":
-                        messagebox.showerror(title, message)
-                    elif msg_type == "info":
-                        messagebox.showinfo(title, message)
-            except queue.Empty:
-                pass
-            root.after(100, process_queue)
+                    elif event.kind == "error":
+                        messagebox.showerror(event.title, event.message)
+                    elif event.kind == "info":
+                        messagebox.showinfo(event.title, event.message)
+                    elif event.kind == "file_count":
+                        # Ignore counts for a folder that is no longer selected
+                        if event.title == input_dir_var.get():
+                            file_count_var.set(event.message)
+                    elif event.kind == "enable_buttons":
+                        finish_cancel_token()
+                        update_button_states()
+                except Exception as e:
+                    logger.error(f"Error applying UI event {event.kind}: {e}")
+                    logger.debug(traceback.format_exc())
+            root.after(1000 // MAX_UI_UPDATES_PER_SECOND, process_queue)
 
     
 
         def split_based_on_tab(notebook, message_queue):
             current_tab = notebook.tab(notebook.select(), "text")
             if current_tab == "Split Single File":
-                threading.Thread(
-                    target=split_single_file, args=(message_queue,), daemon=True
-                ).start()
+                run_single_file_split(message_queue)
             elif current_tab == "Batch Split":
                 run_splitter(message_queue)
 
@@ -1917,11 +1878,14 @@ def main():
 def split_based_on_tab(notebook, message_queue):
     current_tab = notebook.tab(notebook.select(), "text")
     if current_tab == "Split Single File":
-        threading.Thread(
-            target=split_single_file, args=(message_queue,), daemon=True
-        ).start()
+        run_single_file_split(message_queue)
     elif current_tab == "Batch Split":
         run_splitter(message_queue)
 
 if __name__ == "__main__":
+    # Needed for the batch process pool in frozen builds
+    multiprocessing.freeze_support()
+    setup_logging()
+    setup_tkdnd()
+    setup_ffmpeg()
     main()
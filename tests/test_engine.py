@@ -0,0 +1,285 @@
+"""
+Split engine tests on small synthetic WAV files. Sources are written byte by
+byte so RIFF and RF64 layouts are exact, and every check reads the outputs
+back from disk.
+"""
+import os
+import struct
+
+import numpy as np
+import pytest
+
+from audio_splitter_engine import (
+    PEAK_CACHE_RESOLUTIONS,
+    PEAK_FILE_SUFFIX,
+    WAVE_FORMAT_PCM,
+    CancelToken,
+    get_journal_path,
+    make_split_options,
+    parse_channel_groups,
+    read_wav_layout,
+    split_channels,
+    split_file_task,
+)
+
+SAMPLE_RATE = 48000
+
+
+def make_frames(frames, channels, bits_per_sample=24, seed=0):
+    # Full-range noise left in the low bits_per_sample bits of int32
+    rng = np.random.default_rng(seed)
+    limit = 1 << (bits_per_sample - 1)
+    return rng.integers(-limit, limit, size=(frames, channels), dtype=np.int32)
+
+
+def pack_frames(frames, bits_per_sample):
+    bytes_per_sample = bits_per_sample // 8
+    samples = np.ascontiguousarray(frames, dtype='<i4').view(np.uint8).reshape(*frames.shape, 4)
+    return samples[..., :bytes_per_sample].tobytes()
+
+
+def write_wav(path, frames, bits_per_sample=24, rf64=False):
+    channels = frames.shape[1]
+    block_align = channels * bits_per_sample // 8
+    data = pack_frames(frames, bits_per_sample)
+    fmt = struct.pack(
+        '<HHIIHH',
+        WAVE_FORMAT_PCM,
+        channels,
+        SAMPLE_RATE,
+        SAMPLE_RATE * block_align,
+        block_align,
+        bits_per_sample,
+    )
+    body = b'WAVE'
+    if rf64:
+        riff_size = 4 + (8 + 28) + (8 + len(fmt)) + (8 + len(data))
+        body += b'ds64' + struct.pack('<IQQQI', 28, riff_size, len(data), len(frames), 0)
+    body += b'fmt ' + struct.pack('<I', len(fmt)) + fmt
+    body += b'data' + struct.pack('<I', 0xFFFFFFFF if rf64 else len(data)) + data
+    if len(data) & 1:
+        body += b'\x00'
+    with open(path, 'wb') as f:
+        if rf64:
+            f.write(b'RF64' + struct.pack('<I', 0xFFFFFFFF) + body)
+        else:
+            f.write(b'RIFF' + struct.pack('<I', len(body)) + body)
+
+
+def read_data(path):
+    layout = read_wav_layout(path)
+    with open(path, 'rb') as f:
+        f.seek(layout['data_offset'])
+        return f.read(layout['data_size'])
+
+
+def list_outputs(output_dir):
+    return sorted(
+        name for name in os.listdir(output_dir) if name.endswith(('.wav', PEAK_FILE_SUFFIX))
+    )
+
+
+def test_native_split_matches_source_channels(tmp_path):
+    frames = make_frames(1001, 4)
+    source = str(tmp_path / "take.wav")
+    write_wav(source, frames)
+    group = parse_channel_groups("2+4")[0]
+    outputs = [
+        (0, str(tmp_path / "chan1.wav")),
+        (2, str(tmp_path / "chan3.wav")),
+        (group, str(tmp_path / "chan2-4.wav")),
+    ]
+
+    # A block size that is not a multiple of the frame size
+    assert split_channels(source, outputs, block_size=1000)
+
+    assert read_data(outputs[0][1]) == pack_frames(frames[:, [0]], 24)
+    assert read_data(outputs[1][1]) == pack_frames(frames[:, [2]], 24)
+    assert read_data(outputs[2][1]) == pack_frames(frames[:, [1, 3]], 24)
+    layout = read_wav_layout(outputs[2][1])
+    assert (layout['channels'], layout['sample_rate'], layout['bits_per_sample']) == (2, SAMPLE_RATE, 24)
+
+
+def test_split_converts_bit_depth(tmp_path):
+    frames = make_frames(300, 2, bits_per_sample=16)
+    source = str(tmp_path / "take.wav")
+    write_wav(source, frames, bits_per_sample=16)
+    output = str(tmp_path / "chan2.wav")
+
+    assert split_channels(source, [(1, output)], override_bit_depth=24)
+
+    assert read_wav_layout(output)['bits_per_sample'] == 24
+    assert read_data(output) == pack_frames(frames[:, [1]] << 8, 24)
+
+
+def test_read_wav_layout_rf64(tmp_path):
+    frames = make_frames(257, 3)
+    source = str(tmp_path / "long.wav")
+    write_wav(source, frames, rf64=True)
+
+    layout = read_wav_layout(source)
+
+    assert layout['rf64']
+    assert layout['channels'] == 3
+    assert layout['bits_per_sample'] == 24
+    # The 0xFFFFFFFF data size is resolved through the ds64 chunk
+    assert layout['data_size'] == len(frames) * 3 * 3
+    assert [chunk_id for chunk_id, _, _ in layout['chunks']] == [b'ds64', b'fmt ', b'data']
+
+    output = str(tmp_path / "chan3.wav")
+    assert split_channels(source, [(2, output)])
+    assert read_data(output) == pack_frames(frames[:, [2]], 24)
+
+
+def test_resume_skips_up_to_date_outputs(tmp_path):
+    source = str(tmp_path / "take.wav")
+    write_wav(source, make_frames(500, 2))
+    output_dir = str(tmp_path / "split")
+    options = make_split_options(journal_path=get_journal_path(output_dir))
+    outputs = [os.path.join(output_dir, f"take_chan{idx}.wav") for idx in (1, 2)]
+
+    first = split_file_task(source, output_dir, options)
+    assert first["success"]
+    assert sorted(first["outputs"]) == outputs
+    mtimes = [os.stat(output).st_mtime_ns for output in outputs]
+
+    second = split_file_task(source, output_dir, options)
+    assert second["success"]
+    assert sorted(second["skipped"]) == outputs
+    assert second["outputs"] == []
+    assert [os.stat(output).st_mtime_ns for output in outputs] == mtimes
+
+    # A missing output is redone on its own
+    os.remove(outputs[1])
+    third = split_file_task(source, output_dir, options)
+    assert third["skipped"] == [outputs[0]]
+    assert third["outputs"] == [outputs[1]]
+
+    # A changed source redoes everything
+    write_wav(source, make_frames(500, 2, seed=1))
+    fourth = split_file_task(source, output_dir, options)
+    assert fourth["skipped"] == []
+    assert sorted(fourth["outputs"]) == outputs
+
+
+def test_resume_off_splits_everything(tmp_path):
+    source = str(tmp_path / "take.wav")
+    write_wav(source, make_frames(200, 2))
+    output_dir = str(tmp_path / "split")
+    options = make_split_options(journal_path=get_journal_path(output_dir), resume=False)
+
+    split_file_task(source, output_dir, options)
+    result = split_file_task(source, output_dir, options)
+
+    assert result["skipped"] == []
+    assert len(result["outputs"]) == 2
+
+
+def test_duplicate_link_survives_resplit(tmp_path):
+    frames = make_frames(400, 3)
+    frames[:, 1] = frames[:, 0]
+    source = str(tmp_path / "take.wav")
+    write_wav(source, frames)
+    output_dir = str(tmp_path / "split")
+    options = make_split_options(duplicate_action="link")
+    chan1, chan2, chan3 = (os.path.join(output_dir, f"take_chan{idx}.wav") for idx in (1, 2, 3))
+
+    first = split_file_task(source, output_dir, options)
+    assert first["success"]
+    assert [(duplicate["output"], duplicate["linked"]) for duplicate in first["duplicates"]] == [
+        (chan2, True)
+    ]
+    assert os.path.samefile(chan1, chan2)
+
+    # Once the channels differ, writing one output must not overwrite its former link
+    frames[:, 1] = make_frames(400, 1, seed=1)[:, 0]
+    write_wav(source, frames)
+    second = split_file_task(source, output_dir, options)
+    assert second["success"]
+    assert second["duplicates"] == []
+    assert not os.path.samefile(chan1, chan2)
+    for idx, output in enumerate((chan1, chan2, chan3)):
+        assert read_data(output) == pack_frames(frames[:, [idx]], 24)
+
+
+def test_duplicate_manifest_removes_copies(tmp_path):
+    frames = make_frames(400, 2)
+    frames[:, 1] = frames[:, 0]
+    source = str(tmp_path / "take.wav")
+    write_wav(source, frames)
+    output_dir = str(tmp_path / "split")
+
+    result = split_file_task(source, output_dir, make_split_options(duplicate_action="manifest"))
+
+    assert result["success"]
+    assert result["outputs"] == [os.path.join(output_dir, "take_chan1.wav")]
+    assert [duplicate["linked"] for duplicate in result["duplicates"]] == [False]
+    assert os.path.exists(os.path.join(output_dir, "take_duplicates.json"))
+    assert not os.path.exists(os.path.join(output_dir, "take_chan2.wav"))
+
+
+def test_cancel_removes_partial_outputs(tmp_path):
+    source = str(tmp_path / "take.wav")
+    write_wav(source, make_frames(5000, 4))
+    output_dir = str(tmp_path / "split")
+    options = make_split_options(block_size=1200, peak_files=True)
+    cancel_token = CancelToken()
+    blocks = []
+
+    def progress_callback(num_bytes):
+        blocks.append(num_bytes)
+        if len(blocks) == 2:
+            cancel_token.cancel()
+
+    result = split_file_task(source, output_dir, options, progress_callback, cancel_token)
+
+    assert result["cancelled"]
+    assert not result["success"]
+    assert len(blocks) == 2
+    assert list_outputs(output_dir) == []
+
+
+def test_peak_file_matches_output(tmp_path):
+    frames = make_frames(70000, 2, bits_per_sample=16)
+    source = str(tmp_path / "take.wav")
+    write_wav(source, frames, bits_per_sample=16)
+    output_dir = str(tmp_path / "split")
+
+    result = split_file_task(source, output_dir, make_split_options(peak_files=True, block_size=3000))
+
+    assert result["success"]
+    with open(os.path.join(output_dir, "take_chan2.wav" + PEAK_FILE_SUFFIX), 'rb') as f:
+        data = f.read()
+    magic, _, channels, sample_rate, frame_count, level_count = struct.unpack_from('<4sHHIQH', data)
+    assert (magic, channels, sample_rate, frame_count) == (b'ZQPK', 1, SAMPLE_RATE, len(frames))
+    assert level_count == len(PEAK_CACHE_RESOLUTIONS)
+    offset = struct.calcsize('<4sHHIQH')
+    levels = [struct.unpack_from('<IQ', data, offset + idx * 12) for idx in range(level_count)]
+    offset += level_count * 12
+    values = frames[:, 1] / 32768.0
+    for samples_per_peak, count in levels:
+        assert count == -(-len(frames) // samples_per_peak)
+        pairs = np.frombuffer(data, '<i2', count * 2, offset).reshape(count, 2)
+        offset += count * 4
+        for idx in range(count):
+            segment = values[idx * samples_per_peak:(idx + 1) * samples_per_peak]
+            assert pairs[idx, 0] == np.floor(segment.min() * 32767)
+            assert pairs[idx, 1] == np.ceil(segment.max() * 32767)
+    assert offset == len(data)
+
+
+@pytest.mark.parametrize("bits_per_sample", [16, 24])
+def test_silent_channel_is_skipped(tmp_path, bits_per_sample):
+    frames = make_frames(600, 2, bits_per_sample=bits_per_sample)
+    frames[:, 1] = 0
+    source = str(tmp_path / "take.wav")
+    write_wav(source, frames, bits_per_sample=bits_per_sample)
+    output_dir = str(tmp_path / "split")
+
+    result = split_file_task(
+        source, output_dir, make_split_options(silence_threshold_db=-90.0, peak_files=True)
+    )
+
+    assert result["success"]
+    assert [silent["output"] for silent in result["silent"]] == [os.path.join(output_dir, "take_chan2.wav")]
+    assert list_outputs(output_dir) == ["take_chan1.wav", "take_chan1.wav" + PEAK_FILE_SUFFIX]